@@ -5,18 +5,112 @@ AI Financial Advisor
 LLM-powered financial advisor with location context.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-import json
+from typing import Optional, List, Dict, Any, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+import asyncio
+import operator
+import orjson
 
-from backend.config import settings
-from backend.llm.client import get_llm_client
+from backend.llm.client import LLMClient, get_llm_client
 from backend.api.cost_of_living import get_cost_service
 from backend.utils.logger import get_logger
 
 logger = get_logger("ai_advisor")
-router = APIRouter(prefix="/advisor", tags=["advisor"])
+router = APIRouter(prefix="/advisor", tags=["advisor"], default_response_class=ORJSONResponse)
+
+
+# ============================================
+# Personality Tables
+# ============================================
+
+# Base personalities
+_BASE_PERSONALITIES = MappingProxyType({
+    "penguin": {
+        "name": "Penny the Penguin 🐧",
+        "style": "cheerful and bubbly",
+        "tone": "Super upbeat! Loves celebrating wins with penguin waddles! Uses ice/water puns! 🧊❄️"
+    },
+    "dragon": {
+        "name": "Esper the Dragon 🐉",
+        "style": "wise guardian of treasure",
+        "tone": "Mystical and protective! Calls money 'treasure hoard'. Breathes wisdom fire! 💎🔥"
+    },
+    "cat": {
+        "name": "Mochi the Cat 🐱",
+        "style": "sassy but adorable",
+        "tone": "Playfully sassy! Purrs when happy, swishes tail when concerned! 😸✨"
+    },
+    "capybara": {
+        "name": "Capy the Capybara 🦫",
+        "style": "zen master of chill",
+        "tone": "Ultra relaxed! Everything's gonna be okay vibes! Promotes mindful spending! 🌿☮️"
+    }
+})
+
+# (upper bound of friendship level, relationship) in ascending order
+_RELATIONSHIP_TIERS = (
+    (20, "Just becoming friends! Be warm but professional. 👋"),
+    (50, "Friends now! Show personality, care about their goals! 😊💕"),
+    (80, "Good friends! Celebrate wins, give gentle guidance! 🎉🤗"),
+    (float("inf"), "BEST FRIENDS FOREVER! Be super enthusiastic, inside jokes welcome! 🎈✨💖"),
+)
+
+# Adjustments based on mood
+_MOOD_ADJUSTMENTS = MappingProxyType({
+    "happy": "They're crushing it! 🌟 Celebrate and cheer!",
+    "worried": "Budget's getting tight! 😅 Be supportive, quick tips!",
+    "excited": "Uh oh, over budget! 😬 Kind but firm, actionable help!"
+})
+
+
+# ============================================
+# Prompt Templates
+# ============================================
+
+_CITY_TEMPLATE = """
+
+LOCATION DATA ({city}):
+- Cost of Living Index: {cost_index} (baseline: NYC = 100)
+- Rent Index: {rent_index}
+- Groceries Index: {groceries_index}
+- Restaurant Index: {restaurant_index}
+- Local Purchasing Power: {purchasing_power}
+- Source: {source}
+"""
+
+_USER_CONTEXT_TEMPLATE = """
+
+USER BUDGET CONTEXT:
+{}
+"""
+
+_PROMPT_TAIL = """
+
+Provide a helpful, location-aware answer. Be specific and practical.
+If the question is about buying vs renting, provide a comparison table.
+If about restaurants or businesses, suggest specific types or areas known for value.
+"""
+
+
+# ============================================
+# Insight Rules
+# ============================================
+
+# (city_data key, comparison, threshold, message) - checked in order
+_INSIGHT_RULES = (
+    # Cost insights
+    ("cost_index", operator.gt, 90, "{city} is an expensive city. Budget carefully!"),
+    ("cost_index", operator.lt, 50, "{city} is very affordable. Your money goes further here!"),
+    # Rent insights
+    ("rent_index", operator.gt, 100, "Rent in {city} is above average. Consider roommates or suburbs."),
+    ("rent_index", operator.lt, 60, "Rent in {city} is relatively affordable."),
+    # Purchasing power
+    ("purchasing_power", operator.gt, 90, "High purchasing power in {city} means better value for your income."),
+)
 
 
 # ============================================
@@ -56,106 +150,179 @@ async def ask_advisor(request: AdvisorRequest):
     - "What's the average cost of housing in Austin?"
     - "Should I move to Portland or Denver for better savings?"
     """
-    logger.info(f"AI Advisor question: {request.question} (city: {request.city})")
+    logger.info("AI Advisor question: %s (city: %s)", request.question, request.city)
     
     try:
-        # Get city data if specified
-        city_data = None
-        if request.city:
-            cost_service = get_cost_service()
-            city_data = await cost_service.get_city_data(request.city, request.country)
-        
-        # Build personality based on pet type and friendship
-        personality = _build_personality(
-            request.pet_type,
-            request.friendship_level,
-            request.mood
-        )
+        llm = get_llm_client()
+        return await _answer_question(request, llm)
         
-        # Build context for LLM
-        llm_context = _build_llm_context(
-            request.question,
-            city_data,
-            request.context,
-            personality
+    except Exception as e:
+        logger.error("AI Advisor error: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get advice: {str(e)}"
         )
-        
-        # Get LLM response
+
+
+@router.post("/ask_batch", response_model=List[AdvisorResponse])
+async def ask_advisor_batch(
+    requests: List[AdvisorRequest] = Body(..., min_length=1, max_length=20)
+):
+    """
+    Ask the AI financial advisor several questions in one round-trip.
+    
+    Questions are answered concurrently (bounded by LLM_MAX_CONCURRENCY)
+    and returned in the same order they were sent, e.g. to regenerate
+    advice across a list of cities. If one question fails the rest are
+    cancelled rather than left running.
+    """
+    logger.info("AI Advisor batch: %s questions", len(requests))
+    
+    try:
         llm = get_llm_client()
-        answer = await llm.generate(
-            prompt=llm_context,
-            temperature=0.8,
-            max_tokens=200  # Keep responses brief and cute
-        )
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_answer_question(request, llm)) for request in requests]
+        return [task.result() for task in tasks]
         
-        # Generate related insights
-        insights = []
-        if city_data:
-            insights = _generate_insights(city_data, request.context)
-        
-        return AdvisorResponse(
-            answer=answer,
-            city_data=city_data,
-            related_insights=insights
+    except Exception as e:
+        # Report the first failure rather than the TaskGroup wrapper
+        if isinstance(e, ExceptionGroup):
+            e = e.exceptions[0]
+        logger.error("AI Advisor batch error: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get advice: {str(e)}"
         )
-        
+
+
+@router.post("/ask/stream")
+async def ask_advisor_stream(request: AdvisorRequest):
+    """
+    Ask the AI financial advisor, streaming the answer as Server-Sent Events.
+    
+    Event sequence:
+    - data: {"city_data": {...}, "related_insights": [...]}
+    - data: {"token": "..."}  (one per generated chunk)
+    - data: {"done": true}
+    
+    Same request body as /ask; the first token arrives as soon as the
+    LLM produces it instead of after the full answer is generated.
+    """
+    logger.info("AI Advisor stream question: %s (city: %s)", request.question, request.city)
+    
+    try:
+        city_data, llm_context = await _prepare_advice(request)
+        llm = get_llm_client()
     except Exception as e:
-        logger.error(f"AI Advisor error: {e}")
+        logger.error("AI Advisor error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get advice: {str(e)}"
         )
+    
+    insights = []
+    if city_data:
+        insights = _generate_insights(city_data, request.context)
+    
+    async def token_gen():
+        yield _sse({"city_data": city_data, "related_insights": insights})
+        try:
+            async for chunk in llm.stream(
+                prompt=llm_context,
+                temperature=0.8,
+                max_tokens=200  # Keep responses brief and cute
+            ):
+                yield _sse({"token": chunk})
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error("AI Advisor stream error: %s", e)
+            yield _sse({"error": f"Failed to get advice: {str(e)}"})
+        yield _sse({"done": True})
+    
+    return StreamingResponse(
+        token_gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ============================================
 # Helper Functions
 # ============================================
 
-def _build_personality(pet_type: str, friendship_level: int, mood: str) -> str:
-    """Build personality traits based on avatar and friendship"""
+async def _answer_question(request: AdvisorRequest, llm: LLMClient) -> AdvisorResponse:
+    """Answer a single advisor question with the given LLM client"""
+    city_data, llm_context = await _prepare_advice(request)
     
-    # Base personalities
-    base_personalities = {
-        "penguin": {
-            "name": "Penny the Penguin 🐧",
-            "style": "cheerful and bubbly",
-            "tone": "Super upbeat! Loves celebrating wins with penguin waddles! Uses ice/water puns! 🧊❄️"
-        },
-        "dragon": {
-            "name": "Esper the Dragon 🐉",
-            "style": "wise guardian of treasure",
-            "tone": "Mystical and protective! Calls money 'treasure hoard'. Breathes wisdom fire! 💎🔥"
-        },
-        "cat": {
-            "name": "Mochi the Cat 🐱",
-            "style": "sassy but adorable",
-            "tone": "Playfully sassy! Purrs when happy, swishes tail when concerned! 😸✨"
-        },
-        "capybara": {
-            "name": "Capy the Capybara 🦫",
-            "style": "zen master of chill",
-            "tone": "Ultra relaxed! Everything's gonna be okay vibes! Promotes mindful spending! 🌿☮️"
-        }
-    }
+    # Get LLM response
+    answer = await llm.generate(
+        prompt=llm_context,
+        temperature=0.8,
+        max_tokens=200  # Keep responses brief and cute
+    )
     
-    base = base_personalities.get(pet_type, base_personalities["penguin"])
-    
-    # Adjust based on friendship level
-    if friendship_level < 20:
-        relationship = "Just becoming friends! Be warm but professional. 👋"
-    elif friendship_level < 50:
-        relationship = "Friends now! Show personality, care about their goals! 😊💕"
-    elif friendship_level < 80:
-        relationship = "Good friends! Celebrate wins, give gentle guidance! 🎉🤗"
-    else:
-        relationship = "BEST FRIENDS FOREVER! Be super enthusiastic, inside jokes welcome! 🎈✨💖"
-    
-    # Adjust based on mood
-    mood_adjustments = {
-        "happy": "They're crushing it! 🌟 Celebrate and cheer!",
-        "worried": "Budget's getting tight! 😅 Be supportive, quick tips!",
-        "excited": "Uh oh, over budget! 😬 Kind but firm, actionable help!"
-    }
+    # Generate related insights
+    insights = []
+    if city_data:
+        insights = _generate_insights(city_data, request.context)
+    
+    return AdvisorResponse(
+        answer=answer,
+        city_data=city_data,
+        related_insights=insights
+    )
+
+
+async def _prepare_advice(request: AdvisorRequest) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Fetch city data and build the full LLM prompt for an advisor request"""
+    # Start the city data fetch first so its network I/O overlaps the
+    # personality build below
+    city_task = None
+    if request.city:
+        cost_service = get_cost_service()
+        city_task = asyncio.create_task(
+            cost_service.get_city_data(request.city, request.country)
+        )
+    
+    # Build personality based on pet type and friendship
+    personality = _build_personality(
+        request.pet_type,
+        _friendship_tier(request.friendship_level),
+        request.mood
+    )
+    
+    city_data = await city_task if city_task else None
+    
+    # Build context for LLM
+    llm_context = _build_llm_context(
+        request.question,
+        city_data,
+        request.context,
+        personality
+    )
+    
+    return city_data, llm_context
+
+
+def _sse(data: Dict[str, Any]) -> bytes:
+    """Format a payload as a single Server-Sent Events message"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def _friendship_tier(friendship_level: int) -> int:
+    """Bucket a 0-100 friendship level into an index of _RELATIONSHIP_TIERS"""
+    return next(
+        tier
+        for tier, (threshold, _) in enumerate(_RELATIONSHIP_TIERS)
+        if friendship_level < threshold
+    )
+
+
+@lru_cache(maxsize=256)
+def _build_personality(pet_type: str, friendship_tier: int, mood: str) -> str:
+    """Build personality traits based on avatar and friendship"""
+    base = _BASE_PERSONALITIES.get(pet_type, _BASE_PERSONALITIES["penguin"])
+    relationship = _RELATIONSHIP_TIERS[friendship_tier][1]
     
     return f"""You are {base['name']}, a {base['style']} financial advisor.
 
@@ -163,7 +330,7 @@ Your vibe: {base['tone']}
 
 Friendship level: {relationship}
 
-Current mood: {mood_adjustments.get(mood, mood_adjustments['happy'])}
+Current mood: {_MOOD_ADJUSTMENTS.get(mood, _MOOD_ADJUSTMENTS['happy'])}
 
 ⚠️ SUPER IMPORTANT: Keep answers SHORT and CUTE! Maximum 2-3 sentences. Use emojis! Be adorable but helpful! Get to the point fast! 🚀
 """
@@ -177,63 +344,28 @@ def _build_llm_context(
 ) -> str:
     """Build complete context for LLM"""
     
-    prompt = f"""{personality}
-
-USER QUESTION: {question}
-"""
+    parts = [personality, f"\n\nUSER QUESTION: {question}\n"]
     
     if city_data:
-        prompt += f"""
-
-LOCATION DATA ({city_data['city']}):
-- Cost of Living Index: {city_data['cost_index']} (baseline: NYC = 100)
-- Rent Index: {city_data['rent_index']}
-- Groceries Index: {city_data['groceries_index']}
-- Restaurant Index: {city_data['restaurant_index']}
-- Local Purchasing Power: {city_data['purchasing_power']}
-- Source: {city_data['source']}
-"""
+        parts.append(_CITY_TEMPLATE.format_map(city_data))
         if city_data.get('note'):
-            prompt += f"\nNote: {city_data['note']}\n"
+            parts.append(f"\nNote: {city_data['note']}\n")
     
     if user_context:
-        prompt += f"""
-
-USER BUDGET CONTEXT:
-{json.dumps(user_context, indent=2)}
-"""
+        parts.append(_USER_CONTEXT_TEMPLATE.format(
+            orjson.dumps(user_context, option=orjson.OPT_NON_STR_KEYS).decode()
+        ))
     
-    prompt += """
-
-Provide a helpful, location-aware answer. Be specific and practical.
-If the question is about buying vs renting, provide a comparison table.
-If about restaurants or businesses, suggest specific types or areas known for value.
-"""
+    parts.append(_PROMPT_TAIL)
     
-    return prompt
+    return "".join(parts)
 
 
 def _generate_insights(city_data: Dict, user_context: Optional[Dict]) -> List[str]:
     """Generate additional insights based on city data"""
-    insights = []
-    
-    cost_idx = city_data['cost_index']
-    rent_idx = city_data['rent_index']
-    
-    # Cost insights
-    if cost_idx > 90:
-        insights.append(f"{city_data['city']} is an expensive city. Budget carefully!")
-    elif cost_idx < 50:
-        insights.append(f"{city_data['city']} is very affordable. Your money goes further here!")
-    
-    # Rent insights
-    if rent_idx > 100:
-        insights.append(f"Rent in {city_data['city']} is above average. Consider roommates or suburbs.")
-    elif rent_idx < 60:
-        insights.append(f"Rent in {city_data['city']} is relatively affordable.")
-    
-    # Purchasing power
-    if city_data['purchasing_power'] > 90:
-        insights.append(f"High purchasing power in {city_data['city']} means better value for your income.")
-    
-    return insights
+    city = city_data['city']
+    return [
+        message.format(city=city)
+        for key, compare, threshold, message in _INSIGHT_RULES
+        if compare(city_data[key], threshold)
+    ]
@@ -5,11 +5,16 @@ Authentication API
 Username-only authentication endpoints.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field, validator
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+import hashlib
+import re
+import time
 import jwt
+from cachetools import TTLCache
 from uuid import UUID
 
 from backend.config import settings
@@ -17,7 +22,18 @@ from backend.database.client import get_database
 from backend.utils.logger import get_logger
 
 logger = get_logger("auth_api")
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=ORJSONResponse)
+
+# Signing key derived once (in production, use a proper secret)
+_JWT_SECRET = settings.SUPABASE_KEY[:32].encode()  # First 32 chars of the key
+_JWT_ALGORITHM = "HS256"
+_TOKEN_LIFETIME_SECONDS = 7 * 24 * 60 * 60
+_JWT_OPTIONS = {"require": ["exp", "sub", "username"], "verify_aud": False}
+
+_USERNAME_RE = re.compile(r"\A[A-Za-z0-9_]{3,50}\Z")
+
+# Decoded payloads of recently verified tokens, keyed by token digest
+_TOKEN_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=300)
 
 
 # ============================================
@@ -28,10 +44,11 @@ class LoginRequest(BaseModel):
     """Login request with username only"""
     username: str = Field(..., min_length=3, max_length=50)
     
-    @validator("username")
+    @field_validator("username")
+    @classmethod
     def username_must_be_valid(cls, v):
         """Validate username format"""
-        if not v.isalnum() and '_' not in v:
+        if not _USERNAME_RE.match(v):
             raise ValueError("Username must be alphanumeric (underscores allowed)")
         return v.lower()
 
@@ -71,19 +88,17 @@ def create_access_token(user_id: str, username: str) -> str:
     Returns:
         JWT token string
     """
-    # Token expires in 7 days
-    expire = datetime.utcnow() + timedelta(days=7)
+    # Token expires in 7 days (epoch seconds, which PyJWT takes as-is)
+    now = int(time.time())
     
     payload = {
         "sub": user_id,
         "username": username,
-        "exp": expire,
-        "iat": datetime.utcnow()
+        "exp": now + _TOKEN_LIFETIME_SECONDS,
+        "iat": now
     }
     
-    # Use a secret key from config (in production, use proper secret)
-    secret = settings.SUPABASE_KEY[:32]  # Use first 32 chars as secret
-    token = jwt.encode(payload, secret, algorithm="HS256")
+    token = jwt.encode(payload, _JWT_SECRET, algorithm=_JWT_ALGORITHM)
     
     return token
 
@@ -101,13 +116,22 @@ def verify_access_token(token: str) -> dict:
     Raises:
         HTTPException if token is invalid
     """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    # Cache hit is only valid while the token itself has not expired
+    payload = _TOKEN_CACHE.get(key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
     try:
-        secret = settings.SUPABASE_KEY[:32]
-        payload = jwt.decode(token, secret, algorithms=["HS256"])
+        payload = jwt.decode(
+            token, _JWT_SECRET, algorithms=[_JWT_ALGORITHM], options=_JWT_OPTIONS
+        )
+        _TOKEN_CACHE[key] = payload
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
@@ -116,7 +140,7 @@ def verify_access_token(token: str) -> dict:
 # ============================================
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, background_tasks: BackgroundTasks):
     """
     Login or create user with username only (no password).
     
@@ -126,7 +150,7 @@ async def login(request: LoginRequest):
     This is intentionally simple for educational purposes.
     In production, use proper OAuth/password authentication.
     """
-    logger.info(f"Login attempt for username: {request.username}")
+    logger.info("Login attempt for username: %s", request.username)
     
     try:
         db = await get_database()
@@ -135,17 +159,17 @@ async def login(request: LoginRequest):
         user = await db.get_user_by_username(request.username)
         
         if user:
-            # Existing user - update last login
-            logger.info(f"Existing user found: {user['id']}")
-            await db.update_user_last_login(user["id"])
+            # Existing user - update last login after the response is sent
+            logger.info("Existing user found: %s", user['id'])
+            background_tasks.add_task(db.update_user_last_login, user["id"])
         else:
             # New user - create account
-            logger.info(f"Creating new user: {request.username}")
+            logger.info("Creating new user: %s", request.username)
             user = await db.create_user(
                 username=request.username,
                 display_name=request.username.capitalize()
             )
-            logger.info(f"New user created: {user['id']}")
+            logger.info("New user created: %s", user['id'])
         
         # Generate access token
         token = create_access_token(
@@ -162,7 +186,7 @@ async def login(request: LoginRequest):
         )
         
     except Exception as e:
-        logger.error(f"Login failed: {e}")
+        logger.error("Login failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Authentication failed: {str(e)}"
@@ -200,7 +224,7 @@ async def get_current_user(token: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to get user: {e}")
+        logger.error("Failed to get user: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve user")
 
 
@@ -215,7 +239,7 @@ async def logout(token: str):
     payload = verify_access_token(token)
     username = payload["username"]
     
-    logger.info(f"User logged out: {username}")
+    logger.info("User logged out: %s", username)
     
     return {"message": "Logged out successfully"}
 
@@ -6,16 +6,36 @@ REST endpoints for budget management.
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from uuid import UUID
+import asyncio
 
 from backend.database.client import get_database
 from backend.utils.logger import get_logger
 
 logger = get_logger("budget_api")
-router = APIRouter(prefix="/budgets", tags=["budgets"])
+router = APIRouter(prefix="/budgets", tags=["budgets"], default_response_class=ORJSONResponse)
+
+_VALID_CATEGORIES = (
+    "food", "transportation", "entertainment", "utilities",
+    "housing", "healthcare", "shopping", "education", "personal", "total", "other"
+)
+_VALID_CATEGORY_SET = frozenset(_VALID_CATEGORIES)
+_VALID_CATEGORIES_MSG = f"Category must be one of: {', '.join(_VALID_CATEGORIES)}"
+_VALID_PERIODS = ("daily", "weekly", "monthly", "yearly")
+_VALID_PERIOD_SET = frozenset(_VALID_PERIODS)
+_VALID_PERIODS_MSG = f"Period must be one of: {', '.join(_VALID_PERIODS)}"
+
+# Trailing window that counts towards each budget period
+_PERIOD_WINDOWS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(days=7),
+    "monthly": timedelta(days=30),
+    "yearly": timedelta(days=365),
+}
 
 
 # ============================================
@@ -29,22 +49,21 @@ class SetBudgetRequest(BaseModel):
     amount: float = Field(..., gt=0)
     period: str = Field(default="monthly", description="daily, weekly, monthly, yearly")
     
-    @validator("category")
+    @field_validator("category")
+    @classmethod
     def validate_category(cls, v):
-        valid_categories = [
-            "food", "transportation", "entertainment", "utilities",
-            "housing", "healthcare", "shopping", "education", "personal", "total", "other"
-        ]
-        if v.lower() not in valid_categories:
-            raise ValueError(f"Category must be one of: {', '.join(valid_categories)}")
-        return v.lower()
+        v = v.lower()
+        if v not in _VALID_CATEGORY_SET:
+            raise ValueError(_VALID_CATEGORIES_MSG)
+        return v
     
-    @validator("period")
+    @field_validator("period")
+    @classmethod
     def validate_period(cls, v):
-        valid_periods = ["daily", "weekly", "monthly", "yearly"]
-        if v.lower() not in valid_periods:
-            raise ValueError(f"Period must be one of: {', '.join(valid_periods)}")
-        return v.lower()
+        v = v.lower()
+        if v not in _VALID_PERIOD_SET:
+            raise ValueError(_VALID_PERIODS_MSG)
+        return v
 
 
 class BudgetResponse(BaseModel):
@@ -71,7 +90,9 @@ class BudgetListResponse(BaseModel):
     """Response model for budget list"""
     budgets: List[BudgetStatus]
     total_budget: float
-    total_spent: float
+    total_spent: float = Field(
+        ..., description="All spending in the last 30 days (the monthly budget window)"
+    )
 
 
 # ============================================
@@ -85,7 +106,7 @@ async def set_budget(request: SetBudgetRequest):
     
     If a budget already exists for the user/category/period, it will be updated.
     """
-    logger.info(f"Setting budget: {request.category} = ${request.amount} ({request.period})")
+    logger.info("Setting budget: %s = $%s (%s)", request.category, request.amount, request.period)
     
     try:
         db = await get_database()
@@ -97,7 +118,7 @@ async def set_budget(request: SetBudgetRequest):
             period=request.period
         )
         
-        logger.info(f"✓ Budget set: {budget['id']}")
+        logger.info("✓ Budget set: %s", budget['id'])
         
         return BudgetResponse(
             id=str(budget["id"]),
@@ -110,7 +131,7 @@ async def set_budget(request: SetBudgetRequest):
         )
         
     except Exception as e:
-        logger.error(f"Failed to set budget: {e}")
+        logger.error("Failed to set budget: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -118,54 +139,35 @@ async def set_budget(request: SetBudgetRequest):
 async def list_budgets(user_id: str):
     """
     Get all budgets for a user with spending status.
+    
+    Each budget's spending covers its own period window, as in /status;
+    total_spent is all spending over the monthly window.
     """
-    logger.info(f"Fetching budgets for user: {user_id}")
+    logger.info("Fetching budgets for user: %s", user_id)
     
     try:
         db = await get_database()
         
-        # Get budgets
-        budgets = await db.get_user_budgets(user_id)
-        
-        # Get expenses to calculate spending
-        expenses = await db.get_user_expenses(user_id, limit=1000)
-        
-        # Calculate spending by category
-        spending_by_category = {}
-        for exp in expenses:
-            cat = exp["category"]
-            spending_by_category[cat] = spending_by_category.get(cat, 0) + exp["amount"]
-        
-        total_spent = sum(spending_by_category.values())
+        # Budgets and their spending come back from a single query, each
+        # counted over the same period window as /status
+        today = date.today()
+        rows = await db.list_budgets_with_spent(
+            user_id,
+            {period: today - window for period, window in _PERIOD_WINDOWS.items()},
+            _period_start("monthly", today)
+        )
         
-        # Build budget statuses
-        budget_statuses = []
-        total_budget = 0
+        # Overall spending over the monthly window, each category counted once
+        total_spent = sum(
+            {row["category"]: float(row["category_spent"]) for row in rows}.values()
+        )
         
-        for budget in budgets:
-            cat = budget["category"]
-            budget_amount = budget["amount"]
-            spent = spending_by_category.get(cat, 0)
-            remaining = budget_amount - spent
-            percentage = (spent / budget_amount * 100) if budget_amount > 0 else 0
-            
-            total_budget += budget_amount
-            
-            budget_statuses.append(BudgetStatus(
-                budget=BudgetResponse(
-                    id=str(budget["id"]),
-                    user_id=str(budget["user_id"]),
-                    category=budget["category"],
-                    amount=budget["amount"],
-                    period=budget["period"],
-                    start_date=budget["start_date"],
-                    created_at=budget["created_at"]
-                ),
-                spent=spent,
-                remaining=remaining,
-                percentage_used=percentage,
-                is_exceeded=spent > budget_amount
-            ))
+        budget_statuses = [
+            _budget_status(row, float(row["spent"]))
+            for row in rows
+            if row["id"] is not None
+        ]
+        total_budget = sum(status.budget.amount for status in budget_statuses)
         
         return BudgetListResponse(
             budgets=budget_statuses,
@@ -174,7 +176,7 @@ async def list_budgets(user_id: str):
         )
         
     except Exception as e:
-        logger.error(f"Failed to fetch budgets: {e}")
+        logger.error("Failed to fetch budgets: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -183,16 +185,18 @@ async def get_budget_status(user_id: str, category: str, period: str = "monthly"
     """
     Get budget status for a specific category.
     """
-    logger.info(f"Fetching budget status: {category} ({period})")
+    logger.info("Fetching budget status: %s (%s)", category, period)
     
     try:
         db = await get_database()
         
-        # Get all budgets and find the matching one
-        budgets = await db.get_user_budgets(user_id)
-        budget = next(
-            (b for b in budgets if b["category"] == category and b["period"] == period),
-            None
+        # Only spending inside the current period counts against the budget
+        period_start = _period_start(period, date.today())
+        
+        # Look up the budget and its category spending together
+        budget, spent = await asyncio.gather(
+            db.get_budget(user_id, category, period),
+            db.get_spent(user_id, category, period_start)
         )
         
         if not budget:
@@ -201,38 +205,12 @@ async def get_budget_status(user_id: str, category: str, period: str = "monthly"
                 detail=f"No budget found for {category} ({period})"
             )
         
-        # Get expenses for this category
-        expenses = await db.get_user_expenses(user_id, limit=1000)
-        spent = sum(
-            exp["amount"]
-            for exp in expenses
-            if exp["category"] == category
-        )
-        
-        budget_amount = budget["amount"]
-        remaining = budget_amount - spent
-        percentage = (spent / budget_amount * 100) if budget_amount > 0 else 0
-        
-        return BudgetStatus(
-            budget=BudgetResponse(
-                id=str(budget["id"]),
-                user_id=str(budget["user_id"]),
-                category=budget["category"],
-                amount=budget["amount"],
-                period=budget["period"],
-                start_date=budget["start_date"],
-                created_at=budget["created_at"]
-            ),
-            spent=spent,
-            remaining=remaining,
-            percentage_used=percentage,
-            is_exceeded=spent > budget_amount
-        )
+        return _budget_status(budget, spent)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to fetch budget status: {e}")
+        logger.error("Failed to fetch budget status: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -242,5 +220,38 @@ async def delete_budget(budget_id: str, user_id: str):
     Delete a budget.
     """
     # TODO: Implement delete operation
-    logger.info(f"Deleting budget: {budget_id}")
+    logger.info("Deleting budget: %s", budget_id)
     raise HTTPException(status_code=501, detail="Delete operation not yet implemented")
+
+
+# ============================================
+# Helper Functions
+# ============================================
+
+def _period_start(period: str, today: date) -> Optional[date]:
+    """First day whose spending counts towards a budget of this period"""
+    window = _PERIOD_WINDOWS.get(period)
+    return today - window if window else None
+
+
+def _budget_status(budget: dict, spent: float) -> BudgetStatus:
+    """Build a BudgetStatus from a budget row and the amount spent against it"""
+    budget_amount = budget["amount"]
+    remaining = budget_amount - spent
+    percentage = (spent / budget_amount * 100) if budget_amount > 0 else 0
+    
+    return BudgetStatus(
+        budget=BudgetResponse(
+            id=str(budget["id"]),
+            user_id=str(budget["user_id"]),
+            category=budget["category"],
+            amount=budget["amount"],
+            period=budget["period"],
+            start_date=budget["start_date"],
+            created_at=budget["created_at"]
+        ),
+        spent=spent,
+        remaining=remaining,
+        percentage_used=percentage,
+        is_exceeded=spent > budget_amount
+    )
@@ -5,15 +5,98 @@ Cost of Living API Integration
 Integration with free cost-of-living data APIs.
 """
 
+import asyncio
+import time
 import httpx
-from typing import Dict, Any, Optional, List
+import orjson
+from collections import defaultdict
+from cachetools import TTLCache
+from typing import Dict, Any, Optional, List, Tuple
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from backend.config import settings
 from backend.utils.logger import get_logger
 
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 logger = get_logger("cost_of_living")
 
 
+# ============================================
+# Mock Data
+# ============================================
+
+# Approximate indices for common cities (baseline = 100 for New York)
+_MOCK_CITIES = {
+    "new york": {"cost_index": 100, "rent_index": 100, "groceries": 100},
+    "san francisco": {"cost_index": 104, "rent_index": 135, "groceries": 108},
+    "los angeles": {"cost_index": 82, "rent_index": 85, "groceries": 84},
+    "chicago": {"cost_index": 77, "rent_index": 67, "groceries": 76},
+    "boston": {"cost_index": 87, "rent_index": 78, "groceries": 86},
+    "seattle": {"cost_index": 86, "rent_index": 83, "groceries": 89},
+    "austin": {"cost_index": 72, "rent_index": 62, "groceries": 70},
+    "london": {"cost_index": 88, "rent_index": 85, "groceries": 82},
+    "paris": {"cost_index": 91, "rent_index": 78, "groceries": 90},
+    "tokyo": {"cost_index": 92, "rent_index": 68, "groceries": 93},
+    "singapore": {"cost_index": 93, "rent_index": 122, "groceries": 88},
+    "sydney": {"cost_index": 86, "rent_index": 76, "groceries": 90},
+    "toronto": {"cost_index": 75, "rent_index": 65, "groceries": 77},
+    "bangalore": {"cost_index": 26, "rent_index": 18, "groceries": 28},
+    "mumbai": {"cost_index": 32, "rent_index": 42, "groceries": 34},
+    "delhi": {"cost_index": 25, "rent_index": 21, "groceries": 27},
+}
+
+
+def _derive_mock_indices(city: Dict[str, float]) -> Dict[str, float]:
+    """Expand raw mock figures into the full set of indices"""
+    return {
+        "cost_index": city["cost_index"],
+        "rent_index": city["rent_index"],
+        "groceries_index": city["groceries"],
+        "restaurant_index": city["cost_index"] * 0.95,
+        "purchasing_power": 100 - (city["cost_index"] * 0.3),
+    }
+
+
+# Derived indices computed once, keyed by lower-cased city name
+_MOCK_CITY_INDICES = MappingProxyType({
+    name: _derive_mock_indices(city) for name, city in _MOCK_CITIES.items()
+})
+_MOCK_DEFAULT_INDICES = _derive_mock_indices(
+    {"cost_index": 60, "rent_index": 50, "groceries": 60}
+)
+
+# Average monthly spending benchmarks (based on NYC baseline)
+_NYC_BENCHMARKS = {
+    "food": 600.0,
+    "transportation": 150.0,
+    "entertainment": 200.0,
+    "utilities": 150.0,
+    "housing": 2000.0,
+    "healthcare": 300.0,
+    "shopping": 250.0,
+    "personal": 150.0
+}
+
+_SPENDING_INSIGHT_HIGHER = "Your {category} spending is {percent:.0f}% higher than {city} average"
+_SPENDING_INSIGHT_LOWER = "Your {category} spending is {percent:.0f}% lower than {city} average"
+
+
+# Shared cache epoch: bumping it (INCR col:epoch, then PUBLISH col:invalidate
+# '{"epoch": N}') invalidates cached city data in every worker
+_EPOCH_KEY = "col:epoch"
+_INVALIDATE_CHANNEL = "col:invalidate"
+
+
+def _redis_key(cache_key: Tuple[str, str], epoch: int) -> str:
+    """Redis key for a (city, country) cache key within a cache epoch"""
+    return f"col:{epoch}:{cache_key[0]}:{cache_key[1]}"
+
+
 class CostOfLivingService:
     """
     Service for fetching cost-of-living data from free APIs.
@@ -27,8 +110,56 @@ class CostOfLivingService:
     def __init__(self):
         self.base_url = "https://cost-of-living-and-prices.p.rapidapi.com"
         self.api_key = getattr(settings, 'RAPIDAPI_KEY', None)
-        self.cache = {}  # Simple in-memory cache
         self.cache_duration = timedelta(days=7)  # Cache for 7 days
+        self._ttl_seconds = self.cache_duration.total_seconds()
+        # Entries are (data, monotonic expiry time); TTLCache evicts on the same clock
+        self.cache: TTLCache = TTLCache(maxsize=1024, ttl=self._ttl_seconds)
+        # Mock fallbacks after an API failure are kept briefly so repeated
+        # bad lookups don't pay the upstream timeout every time
+        self._negative_ttl_seconds = timedelta(hours=1).total_seconds()
+        self._negative_cache: TTLCache = TTLCache(maxsize=1024, ttl=self._negative_ttl_seconds)
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}  # One in-flight fetch per city
+        
+        # Optional Redis L2 cache shared by all workers (in-process cache stays as L1)
+        self._redis = None
+        self._epoch = 0  # Bumped on invalidation; L2 keys are namespaced by it
+        self._invalidation_task: Optional[asyncio.Task] = None
+        if settings.REDIS_URL and REDIS_AVAILABLE:
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+        elif settings.REDIS_URL:
+            logger.warning("REDIS_URL is set but redis is not installed; using in-process cache only")
+        
+        # Long-lived pooled client so cache misses reuse open connections
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "X-RapidAPI-Key": self.api_key or "",
+                "X-RapidAPI-Host": "cost-of-living-and-prices.p.rapidapi.com"
+            },
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            http2=True
+        )
+    
+    async def aclose(self):
+        """Close the underlying HTTP connection pool (and Redis, if used)"""
+        if self._invalidation_task is not None:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+        await self._http.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+    
+    async def __aenter__(self) -> "CostOfLivingService":
+        await self.start_invalidation_listener()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
     
     async def get_city_data(
         self,
@@ -43,15 +174,61 @@ class CostOfLivingService:
             country_name: Optional country name for disambiguation
         
         Returns:
-            Cost data including various indices
+            Cost data including various indices (a copy the caller may modify;
+            the cached entry and concurrent callers never share it)
         """
         # Check cache first
-        cache_key = f"{city_name}:{country_name or 'any'}"
-        if cache_key in self.cache:
-            cached_data, cached_time = self.cache[cache_key]
-            if datetime.now() - cached_time < self.cache_duration:
-                logger.info(f"Returning cached data for {city_name}")
-                return cached_data
+        cache_key = (city_name.lower(), (country_name or "").lower())
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached data for {city_name}")
+            return dict(cached[0])
+        
+        # Concurrent misses for the same city share a single upstream fetch
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load_city_data(city_name, country_name, cache_key)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        
+        # Shielded so one caller being cancelled doesn't cancel the others
+        return dict(await asyncio.shield(task))
+    
+    def cache_max_age(self, city_name: str, country_name: Optional[str] = None) -> int:
+        """Seconds until the cached entry for a city expires (0 if not cached)"""
+        cached = self._cache_lookup((city_name.lower(), (country_name or "").lower()))
+        if cached is None:
+            return 0
+        
+        return max(0, int(cached[1] - time.monotonic()))
+    
+    def _cache_lookup(self, cache_key: Tuple[str, str]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Find a (data, expiry) entry in the regular or the negative cache"""
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            cached = self._negative_cache.get(cache_key)
+        return cached
+    
+    def _cache_put(self, cache_key: Tuple[str, str], data: Dict[str, Any]):
+        """Store city data in the in-process cache"""
+        self.cache[cache_key] = (data, time.monotonic() + self._ttl_seconds)
+    
+    async def _load_city_data(
+        self,
+        city_name: str,
+        country_name: Optional[str],
+        cache_key: Tuple[str, str]
+    ) -> Dict[str, Any]:
+        """Fetch city data from the shared cache, API (or mock data) and cache it"""
+        # Results fetched across an invalidation are returned but not cached
+        epoch = self._epoch
+        data = await self._redis_get(cache_key, epoch)
+        if data is not None:
+            if epoch == self._epoch:
+                self._cache_put(cache_key, data)
+            return data
         
         try:
             # Try RapidAPI Cost of Living API
@@ -63,14 +240,91 @@ class CostOfLivingService:
                 data = self._get_mock_data(city_name, country_name)
             
             # Cache the result
-            self.cache[cache_key] = (data, datetime.now())
+            if epoch == self._epoch:
+                self._cache_put(cache_key, data)
+                await self._redis_set(cache_key, data, epoch)
             
             return data
             
         except Exception as e:
             logger.error(f"Failed to fetch cost data for {city_name}: {e}")
-            # Return mock data on error
-            return self._get_mock_data(city_name, country_name)
+            # Return mock data on error (cached only for the short negative TTL)
+            data = self._get_mock_data(city_name, country_name)
+            if epoch == self._epoch:
+                self._negative_cache[cache_key] = (data, time.monotonic() + self._negative_ttl_seconds)
+            return data
+    
+    async def start_invalidation_listener(self):
+        """Sync with the shared cache epoch and follow invalidations published by other workers"""
+        if self._redis is None or self._invalidation_task is not None:
+            return
+        try:
+            self._apply_epoch(int(await self._redis.get(_EPOCH_KEY) or 0))
+        except Exception as e:
+            logger.warning(f"Could not read cache epoch from Redis: {e}")
+            return
+        self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+    
+    async def invalidate_cache(self) -> int:
+        """Drop all cached city data (in every worker when Redis is used); returns the new epoch"""
+        if self._redis is None:
+            self._apply_epoch(self._epoch + 1)
+            return self._epoch
+        
+        epoch = await self._redis.incr(_EPOCH_KEY)
+        self._apply_epoch(epoch)
+        await self._redis.publish(_INVALIDATE_CHANNEL, orjson.dumps({"epoch": epoch}))
+        return epoch
+    
+    def _apply_epoch(self, epoch: int):
+        """Move to a newer cache epoch, clearing the in-process caches"""
+        if epoch <= self._epoch:
+            return
+        self._epoch = epoch
+        self.cache.clear()
+        self._negative_cache.clear()
+        logger.info(f"✓ Cost-of-living cache invalidated (epoch {epoch})")
+    
+    async def _listen_for_invalidations(self):
+        """Apply epochs published on the invalidation channel until cancelled"""
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(_INVALIDATE_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    self._apply_epoch(int(orjson.loads(message["data"])["epoch"]))
+                except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                    logger.warning(f"Ignoring malformed cache invalidation: {message['data']!r}")
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener stopped: {e}")
+        finally:
+            await pubsub.aclose()
+    
+    async def _redis_get(self, cache_key: Tuple[str, str], epoch: int) -> Optional[Dict[str, Any]]:
+        """Look up city data in Redis (None on miss, or if Redis is unavailable)"""
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(_redis_key(cache_key, epoch))
+            return orjson.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+    
+    async def _redis_set(self, cache_key: Tuple[str, str], data: Dict[str, Any], epoch: int):
+        """Store city data in Redis with the same TTL as the in-process cache"""
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                _redis_key(cache_key, epoch),
+                orjson.dumps(data),
+                ex=int(self._ttl_seconds)
+            )
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
     
     async def _fetch_from_rapidapi(
         self,
@@ -78,30 +332,18 @@ class CostOfLivingService:
         country_name: Optional[str]
     ) -> Dict[str, Any]:
         """Fetch data from RapidAPI Cost of Living API"""
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "X-RapidAPI-Key": self.api_key,
-                "X-RapidAPI-Host": "cost-of-living-and-prices.p.rapidapi.com"
-            }
-            
-            # Search for city
-            search_url = f"{self.base_url}/cities"
-            query = {"city_name": city_name}
-            if country_name:
-                query["country_name"] = country_name
-            
-            response = await client.get(
-                search_url,
-                headers=headers,
-                params=query,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Parse and structure the data
-            return self._parse_api_response(data, city_name)
+        # Search for city
+        query = {"city_name": city_name}
+        if country_name:
+            query["country_name"] = country_name
+        
+        response = await self._http.get("/cities", params=query)
+        response.raise_for_status()
+        
+        data = response.json()
+        
+        # Parse and structure the data
+        return self._parse_api_response(data, city_name)
     
     def _parse_api_response(self, api_data: Dict, city_name: str) -> Dict[str, Any]:
         """Parse API response into standardized format"""
@@ -125,41 +367,12 @@ class CostOfLivingService:
         
         Uses approximate real-world indices (baseline = 100 for New York)
         """
-        # Mock data for common cities
-        mock_data = {
-            "new york": {"cost_index": 100, "rent_index": 100, "groceries": 100},
-            "san francisco": {"cost_index": 104, "rent_index": 135, "groceries": 108},
-            "los angeles": {"cost_index": 82, "rent_index": 85, "groceries": 84},
-            "chicago": {"cost_index": 77, "rent_index": 67, "groceries": 76},
-            "boston": {"cost_index": 87, "rent_index": 78, "groceries": 86},
-            "seattle": {"cost_index": 86, "rent_index": 83, "groceries": 89},
-            "austin": {"cost_index": 72, "rent_index": 62, "groceries": 70},
-            "london": {"cost_index": 88, "rent_index": 85, "groceries": 82},
-            "paris": {"cost_index": 91, "rent_index": 78, "groceries": 90},
-            "tokyo": {"cost_index": 92, "rent_index": 68, "groceries": 93},
-            "singapore": {"cost_index": 93, "rent_index": 122, "groceries": 88},
-            "sydney": {"cost_index": 86, "rent_index": 76, "groceries": 90},
-            "toronto": {"cost_index": 75, "rent_index": 65, "groceries": 77},
-            "bangalore": {"cost_index": 26, "rent_index": 18, "groceries": 28},
-            "mumbai": {"cost_index": 32, "rent_index": 42, "groceries": 34},
-            "delhi": {"cost_index": 25, "rent_index": 21, "groceries": 27},
-        }
-        
-        city_key = city_name.lower()
-        city_data = mock_data.get(city_key, {
-            "cost_index": 60,
-            "rent_index": 50,
-            "groceries": 60
-        })
+        city_data = _MOCK_CITY_INDICES.get(city_name.lower(), _MOCK_DEFAULT_INDICES)
         
         return {
             "city": city_name.title(),
             "country": country_name or "Unknown",
-            "cost_index": city_data["cost_index"],
-            "rent_index": city_data["rent_index"],
-            "groceries_index": city_data["groceries"],
-            "restaurant_index": city_data["cost_index"] * 0.95,
-            "purchasing_power": 100 - (city_data["cost_index"] * 0.3),
+            **city_data,
             "currency": "USD",
             "updated_at": datetime.now().isoformat(),
             "source": "mock_data",
@@ -170,7 +383,8 @@ class CostOfLivingService:
         self,
         user_expenses: List[Dict[str, Any]],
         city_name: str,
-        country_name: Optional[str] = None
+        country_name: Optional[str] = None,
+        city_data: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Compare user's spending to city average.
@@ -179,74 +393,61 @@ class CostOfLivingService:
             user_expenses: List of user expense records
             city_name: City to compare against
             country_name: Optional country name
+            city_data: Already-fetched city data (skips the lookup)
         
         Returns:
-            Comparison with insights
+            Comparison with insights (and the city_data it was based on)
         """
         # Get city data
-        city_data = await self.get_city_data(city_name, country_name)
+        if city_data is None:
+            city_data = await self.get_city_data(city_name, country_name)
         
         # Calculate user spending by category
-        user_spending = {}
+        user_spending = defaultdict(float)
         for expense in user_expenses:
-            cat = expense.get("category", "other")
-            amount = expense.get("amount", 0)
-            user_spending[cat] = user_spending.get(cat, 0) + amount
-        
-        # Average monthly spending benchmarks (based on NYC baseline)
-        nyc_benchmarks = {
-            "food": 600,
-            "transportation": 150,
-            "entertainment": 200,
-            "utilities": 150,
-            "housing": 2000,
-            "healthcare": 300,
-            "shopping": 250,
-            "personal": 150
-        }
+            user_spending[expense.get("category", "other")] += expense.get("amount", 0)
         
         # Adjust benchmarks for this city
         cost_ratio = city_data["cost_index"] / 100.0
-        city_benchmarks = {
-            cat: amount * cost_ratio
-            for cat, amount in nyc_benchmarks.items()
-        }
         
-        # Compare
+        # Compare (only categories the user actually spent in)
         comparisons = {}
         insights = []
         
         for category, user_amount in user_spending.items():
-            if category in city_benchmarks:
-                benchmark = city_benchmarks[category]
-                difference = user_amount - benchmark
-                percentage_diff = (difference / benchmark * 100) if benchmark > 0 else 0
-                
-                comparisons[category] = {
-                    "user_spent": user_amount,
-                    "city_average": benchmark,
-                    "difference": difference,
-                    "percentage_diff": percentage_diff
-                }
-                
-                # Generate insight
-                if percentage_diff > 20:
-                    insights.append(
-                        f"Your {category} spending is {abs(percentage_diff):.0f}% "
-                        f"higher than {city_name} average"
-                    )
-                elif percentage_diff < -20:
-                    insights.append(
-                        f"Your {category} spending is {abs(percentage_diff):.0f}% "
-                        f"lower than {city_name} average"
-                    )
+            nyc_benchmark = _NYC_BENCHMARKS.get(category)
+            if nyc_benchmark is None:
+                continue
+            
+            # NYC itself (and the default index) needs no scaling
+            benchmark = nyc_benchmark if cost_ratio == 1.0 else nyc_benchmark * cost_ratio
+            difference = user_amount - benchmark
+            percentage_diff = (difference / benchmark * 100) if benchmark > 0 else 0
+            
+            comparisons[category] = {
+                "user_spent": user_amount,
+                "city_average": benchmark,
+                "difference": difference,
+                "percentage_diff": percentage_diff
+            }
+            
+            # Generate insight
+            if percentage_diff > 20:
+                insights.append(_SPENDING_INSIGHT_HIGHER.format(
+                    category=category, percent=percentage_diff, city=city_name
+                ))
+            elif percentage_diff < -20:
+                insights.append(_SPENDING_INSIGHT_LOWER.format(
+                    category=category, percent=-percentage_diff, city=city_name
+                ))
         
         return {
             "city": city_data["city"],
             "cost_index": city_data["cost_index"],
             "comparisons": comparisons,
             "insights": insights,
-            "overall_status": self._get_overall_status(comparisons)
+            "overall_status": self._get_overall_status(comparisons),
+            "city_data": city_data
         }
     
     def _get_overall_status(self, comparisons: Dict) -> str:
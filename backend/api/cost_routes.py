@@ -5,16 +5,21 @@ Cost of Living API Endpoints
 REST endpoints for cost-of-living data.
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+import asyncio
+import hashlib
+import orjson
 
 from backend.api.cost_of_living import get_cost_service
 from backend.database.client import get_database
+from backend.utils.http import etag_matches
 from backend.utils.logger import get_logger
 
 logger = get_logger("cost_api")
-router = APIRouter(prefix="/cost-of-living", tags=["cost-of-living"])
+router = APIRouter(prefix="/cost-of-living", tags=["cost-of-living"], default_response_class=ORJSONResponse)
 
 
 # ============================================
@@ -45,6 +50,13 @@ class ComparisonResponse(BaseModel):
     overall_status: str
 
 
+class InsightsBatchRequest(BaseModel):
+    """Request for spending insights for several users in one city"""
+    user_ids: List[str] = Field(..., min_length=1, max_length=100)
+    city_name: str
+    country: Optional[str] = None
+
+
 # ============================================
 # Cost of Living Endpoints
 # ============================================
@@ -52,11 +64,16 @@ class ComparisonResponse(BaseModel):
 @router.get("/city/{city_name}", response_model=CityDataResponse)
 async def get_city_cost_data(
     city_name: str,
+    request: Request,
+    response: Response,
     country: Optional[str] = None
 ):
     """
     Get cost-of-living data for a city.
     
+    Clients and CDNs may reuse the response until the server-side cache
+    entry expires; a matching If-None-Match gets a 304.
+    
     Parameters:
         city_name: Name of the city
         country: Optional country name for disambiguation
@@ -67,6 +84,17 @@ async def get_city_cost_data(
         service = get_cost_service()
         data = await service.get_city_data(city_name, country)
         
+        etag = _etag(orjson.dumps(data))
+        max_age = service.cache_max_age(city_name, country)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache"
+        }
+        
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        
+        response.headers.update(headers)
         return CityDataResponse(**data)
         
     except Exception as e:
@@ -81,12 +109,15 @@ async def get_city_cost_data(
 async def compare_user_spending(
     user_id: str,
     city_name: str,
+    request: Request,
     country: Optional[str] = None,
     months: int = Query(default=1, ge=1, le=12)
 ):
     """
     Compare user's spending to city average.
     
+    The response carries an ETag; a matching If-None-Match gets a 304.
+    
     Parameters:
         user_id: User ID
         city_name: City to compare against
@@ -96,19 +127,22 @@ async def compare_user_spending(
     logger.info(f"Comparing spending for user {user_id} in {city_name}")
     
     try:
-        # Get user expenses
+        # Get user expenses and city data concurrently
         db = await get_database()
-        expenses = await db.get_user_expenses(user_id, limit=1000)
-        
-        # Get cost service and compare
         service = get_cost_service()
+        expenses, city_data = await asyncio.gather(
+            db.get_user_expenses(user_id, limit=1000, columns="category,amount"),
+            service.get_city_data(city_name, country)
+        )
+        
         comparison = await service.compare_user_spending(
             user_expenses=expenses,
             city_name=city_name,
-            country_name=country
+            country_name=country,
+            city_data=city_data
         )
         
-        return ComparisonResponse(**comparison)
+        return _revalidated_json(request, ComparisonResponse(**comparison).model_dump())
         
     except Exception as e:
         logger.error(f"Failed to compare spending: {e}")
@@ -122,52 +156,134 @@ async def compare_user_spending(
 async def get_spending_insights(
     user_id: str,
     city_name: str,
+    request: Request,
     country: Optional[str] = None
 ):
     """
     Get personalized spending insights based on cost-of-living data.
+    The response carries an ETag; a matching If-None-Match gets a 304.
     """
     logger.info(f"Generating insights for user {user_id}")
     
     try:
-        # Get comparison
+        # Get comparison (expenses and city data fetched concurrently)
         db = await get_database()
-        expenses = await db.get_user_expenses(user_id, limit=1000)
-        
         service = get_cost_service()
+        expenses, city_data = await asyncio.gather(
+            db.get_user_expenses(user_id, limit=1000, columns="category,amount"),
+            service.get_city_data(city_name, country)
+        )
+        
         comparison = await service.compare_user_spending(
             user_expenses=expenses,
             city_name=city_name,
-            country_name=country
+            country_name=country,
+            city_data=city_data
         )
         
-        # Generate additional insights
-        insights = comparison["insights"]
+        return _revalidated_json(
+            request, _build_insights(user_id, city_name, comparison, city_data)
+        )
         
-        # Add more insights based on data
-        city_data = await service.get_city_data(city_name, country)
+    except Exception as e:
+        logger.error(f"Failed to generate insights: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate insights: {str(e)}"
+        )
+
+
+@router.post("/insights_batch")
+async def get_spending_insights_batch(request: InsightsBatchRequest):
+    """
+    Get spending insights for several users against the same city.
+    
+    Spending for all users comes from one aggregated query and the city
+    data is fetched once, instead of one round-trip per user.
+    """
+    logger.info(f"Generating insights for {len(request.user_ids)} users")
+    
+    try:
+        db = await get_database()
+        service = get_cost_service()
+        spending_by_user, city_data = await asyncio.gather(
+            db.get_spending_by_category_bulk(request.user_ids),
+            service.get_city_data(request.city_name, request.country)
+        )
         
-        if city_data["cost_index"] > 90:
-            insights.append(
-                f"{city_name} is an expensive city (cost index: {city_data['cost_index']}). "
-                "Consider budgeting carefully."
-            )
-        elif city_data["cost_index"] < 50:
-            insights.append(
-                f"{city_name} is relatively affordable (cost index: {city_data['cost_index']})."
+        results = []
+        for user_id in request.user_ids:
+            # Per-category totals stand in for individual expense rows
+            expenses = [
+                {"category": category, "amount": total}
+                for category, total in spending_by_user.get(user_id, {}).items()
+            ]
+            comparison = await service.compare_user_spending(
+                user_expenses=expenses,
+                city_name=request.city_name,
+                country_name=request.country,
+                city_data=city_data
             )
+            results.append(_build_insights(user_id, request.city_name, comparison, city_data))
         
-        return {
-            "user_id": user_id,
-            "city": city_name,
-            "insights": insights,
-            "overall_status": comparison["overall_status"],
-            "city_cost_index": city_data["cost_index"]
-        }
+        return results
         
     except Exception as e:
-        logger.error(f"Failed to generate insights: {e}")
+        logger.error(f"Failed to generate batch insights: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate insights: {str(e)}"
         )
+
+
+# ============================================
+# Helper Functions
+# ============================================
+
+def _build_insights(
+    user_id: str,
+    city_name: str,
+    comparison: Dict[str, Any],
+    city_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Combine a spending comparison with city-level insights"""
+    # Generate additional insights
+    insights = comparison["insights"]
+    
+    # Add more insights based on data
+    if city_data["cost_index"] > 90:
+        insights.append(
+            f"{city_name} is an expensive city (cost index: {city_data['cost_index']}). "
+            "Consider budgeting carefully."
+        )
+    elif city_data["cost_index"] < 50:
+        insights.append(
+            f"{city_name} is relatively affordable (cost index: {city_data['cost_index']})."
+        )
+    
+    return {
+        "user_id": user_id,
+        "city": city_name,
+        "insights": insights,
+        "overall_status": comparison["overall_status"],
+        "city_cost_index": city_data["cost_index"]
+    }
+
+
+def _etag(body: bytes) -> str:
+    """Strong ETag for a serialized payload"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _revalidated_json(request: Request, content: Dict[str, Any]) -> Response:
+    """
+    JSON response for per-user data with a strong ETag. Clients must
+    revalidate (private, no-cache); a matching If-None-Match gets a 304.
+    """
+    body = orjson.dumps(content)
+    etag = _etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -5,31 +5,178 @@ Voice Input Service
 Speech-to-text using OpenAI Whisper (local or API).
 """
 
+import asyncio
+import hashlib
 import io
 import os
+import shutil
+import subprocess
 import tempfile
-from typing import Optional, Literal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Literal, Union, Tuple, BinaryIO, AsyncIterator
 from pathlib import Path
 
 try:
     import whisper
+    import numpy as np
     WHISPER_AVAILABLE = True
 except ImportError:
     WHISPER_AVAILABLE = False
 
+try:
+    import ctranslate2
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+    try:
+        from faster_whisper import BatchedInferencePipeline
+    except ImportError:  # faster-whisper < 1.1
+        BatchedInferencePipeline = None
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
 try:
     import sounddevice as sd
     import soundfile as sf
-    import numpy as np
     AUDIO_RECORDING_AVAILABLE = True
 except ImportError:
     AUDIO_RECORDING_AVAILABLE = False
 
+from cachetools import LRUCache
+
 from backend.config import settings
 from backend.utils.logger import get_logger
 
 logger = get_logger("voice_input")
 
+# Decode with ffmpeg over pipes when it is on PATH
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Containers ffmpeg cannot demux from a non-seekable pipe (index may sit at the end)
+_SEEK_REQUIRED_FORMATS = {"m4a", "mp4", "mov", "3gp"}
+
+# Whisper expects 16 kHz mono
+_WHISPER_SAMPLE_RATE = 16000
+
+# Transcripts keyed by (mode, audio content hash), so retried uploads are free
+_transcription_cache: LRUCache = LRUCache(maxsize=settings.TRANSCRIPTION_CACHE_MAX_ENTRIES)
+
+
+def clear_transcription_cache() -> int:
+    """Drop all cached transcripts, returning how many were removed"""
+    count = len(_transcription_cache)
+    _transcription_cache.clear()
+    return count
+
+
+def _hash_audio(source: BinaryIO) -> bytes:
+    """Hash audio content in 1 MiB chunks, leaving the file rewound (blocking)"""
+    digest = hashlib.blake2b(digest_size=16)
+    while chunk := source.read(1 << 20):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.digest()
+
+
+def _api_audio(audio: Union[str, Tuple[str, BinaryIO]]) -> Union[Path, Tuple[str, BinaryIO]]:
+    """Audio argument for the Groq/OpenAI SDKs (paths are read by the SDK without blocking)"""
+    return Path(audio) if isinstance(audio, str) else audio
+
+
+def _spawn_ffmpeg() -> subprocess.Popen:
+    """Start an ffmpeg that decodes stdin to 16 kHz mono s16le PCM on stdout"""
+    return subprocess.Popen(
+        [
+            FFMPEG_PATH, "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(_WHISPER_SAMPLE_RATE),
+            "pipe:1"
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=1 << 20
+    )
+
+
+class _FFmpegPool:
+    """
+    Pre-spawned ffmpeg decoders blocked on stdin.
+    
+    An ffmpeg process can only decode one input, so each one is used once and
+    replaced after the decode, keeping process start-up off the request path.
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._spares: deque = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> subprocess.Popen:
+        """Take a warm ffmpeg (or start one if none is left)"""
+        with self._lock:
+            while self._spares:
+                process = self._spares.popleft()
+                if process.poll() is None:
+                    return process
+        return _spawn_ffmpeg()
+    
+    def refill(self):
+        """Top the pool back up to its size (blocking)"""
+        while True:
+            with self._lock:
+                if len(self._spares) >= self._size:
+                    return
+            process = _spawn_ffmpeg()
+            with self._lock:
+                if len(self._spares) < self._size:
+                    self._spares.append(process)
+                    continue
+            # A concurrent refill got there first
+            process.kill()
+            process.communicate()
+            return
+
+
+_ffmpeg_pool = _FFmpegPool(size=max(1, (os.cpu_count() or 2) // 2))
+
+
+def _decode_pcm(source: BinaryIO) -> "np.ndarray":
+    """Decode audio to 16 kHz mono float32 PCM with a pooled ffmpeg subprocess (blocking)"""
+    process = _ffmpeg_pool.acquire()
+    # Replace it in the background so the next request also finds a warm one
+    threading.Thread(target=_ffmpeg_pool.refill, daemon=True).start()
+    
+    def feed():
+        try:
+            shutil.copyfileobj(source, process.stdin, 1 << 20)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its stderr says why
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+    
+    # Feed stdin from a second thread so a full stdout pipe cannot deadlock us
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    pcm = process.stdout.read()
+    errors = process.stderr.read()  # -loglevel error keeps this small
+    process.wait()
+    feeder.join()
+    
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {errors.decode(errors='ignore').strip()}")
+    
+    # ffmpeg already resampled and downmixed; scale to [-1, 1] in place on the
+    # one float32 copy (multiplying by the reciprocal avoids a float64 intermediate)
+    audio = np.frombuffer(pcm, np.int16).astype(np.float32)
+    audio *= np.float32(1.0 / 32768.0)
+    return audio
+
 
 class VoiceInputService:
     """
@@ -44,26 +191,66 @@ class VoiceInputService:
     def __init__(self, mode: Literal["local", "groq", "openai"] = "local"):
         self.mode = mode
         self.model = None
+        self._client = None  # Async API client (groq/openai), created on first use
+        self._whisper_executor = None
+        self._faster_whisper = False
+        self._batched = None  # faster-whisper batched pipeline, when enabled
         
         if mode == "local":
             self._initialize_local_whisper()
+            # Dedicated inference threads keep Whisper off the event loop.
+            # CTranslate2 runs up to WHISPER_WORKERS transcriptions in parallel;
+            # the PyTorch model must never be entered concurrently
+            self._whisper_executor = ThreadPoolExecutor(
+                max_workers=settings.WHISPER_WORKERS if self._faster_whisper else 1,
+                thread_name_prefix="whisper"
+            )
+            if FFMPEG_PATH and not self._faster_whisper:
+                _ffmpeg_pool.refill()  # Warm decoders for openai-whisper
         
         logger.info(f"VoiceInputService initialized in {mode} mode")
     
     def _initialize_local_whisper(self):
         """Initialize local Whisper model"""
-        if not WHISPER_AVAILABLE:
+        self._faster_whisper = settings.WHISPER_BACKEND == "faster-whisper"
+        
+        if self._faster_whisper and not FASTER_WHISPER_AVAILABLE and WHISPER_AVAILABLE:
+            logger.warning("faster-whisper not installed; falling back to openai-whisper")
+            self._faster_whisper = False
+        if self._faster_whisper and not FASTER_WHISPER_AVAILABLE:
+            raise ImportError(
+                "faster-whisper not installed. Install with: pip install faster-whisper"
+            )
+        if not self._faster_whisper and not WHISPER_AVAILABLE:
             raise ImportError(
                 "openai-whisper not installed. Install with: pip install openai-whisper"
             )
         
         try:
-            # Use base model for speed/accuracy balance
+            # Base model by default for speed/accuracy balance
             # Options: tiny, base, small, medium, large
-            model_size = settings.WHISPER_MODEL_SIZE if hasattr(settings, 'WHISPER_MODEL_SIZE') else "base"
+            model_size = settings.WHISPER_MODEL
             
-            logger.info(f"Loading Whisper model: {model_size}")
-            self.model = whisper.load_model(model_size)
+            backend = "faster-whisper" if self._faster_whisper else "openai-whisper"
+            logger.info(f"Loading Whisper model: {model_size} ({backend})")
+            if self._faster_whisper:
+                # CTranslate2 build with int8 weights: int8 compute on CPU,
+                # int8 weights with fp16 activations on GPU
+                if ctranslate2.get_cuda_device_count() > 0:
+                    self.model = WhisperModel(
+                        model_size, device="cuda", compute_type="int8_float16",
+                        num_workers=settings.WHISPER_WORKERS
+                    )
+                else:
+                    self.model = WhisperModel(
+                        model_size, device="cpu", compute_type="int8",
+                        num_workers=settings.WHISPER_WORKERS
+                    )
+                # Decode a clip's 30 s windows as one batch instead of one by one
+                if settings.WHISPER_BATCH_SIZE > 1 and BatchedInferencePipeline is not None:
+                    self._batched = BatchedInferencePipeline(model=self.model)
+            else:
+                self.model = whisper.load_model(model_size)
             logger.info("✓ Whisper model loaded successfully")
             
         except Exception as e:
@@ -89,19 +276,17 @@ class VoiceInputService:
         else:
             raise ValueError(f"Unknown mode: {self.mode}")
     
-    async def _transcribe_local(self, audio_file_path: str) -> str:
-        """Transcribe using local Whisper model"""
+    async def _transcribe_local(self, audio: Union[str, BinaryIO, "np.ndarray"]) -> str:
+        """Transcribe a file path, decoded PCM (or, with faster-whisper, an in-memory file) using local Whisper model"""
         try:
-            logger.info(f"Transcribing audio file: {audio_file_path}")
+            logger.info(f"Transcribing audio: {audio if isinstance(audio, str) else type(audio).__name__}")
             
-            # Transcribe with Whisper
-            result = self.model.transcribe(
-                audio_file_path,
-                language="en",  # Can be None for auto-detection
-                fp16=False  # Use fp32 for CPU compatibility
+            # Transcribe with Whisper on the dedicated inference thread
+            text = await asyncio.get_running_loop().run_in_executor(
+                self._whisper_executor,
+                self._run_local_model,
+                audio
             )
-            
-            text = result["text"].strip()
             logger.info(f"Transcription result: {text}")
             
             return text
@@ -110,19 +295,44 @@ class VoiceInputService:
             logger.error(f"Local transcription failed: {e}")
             raise
     
-    async def _transcribe_groq(self, audio_file_path: str) -> str:
-        """Transcribe using Groq Whisper API (FREE tier)"""
+    def _run_local_model(self, audio: Union[str, BinaryIO, "np.ndarray"]) -> str:
+        """Blocking transcription with whichever local Whisper build is loaded"""
+        if self._faster_whisper:
+            # Segments are generated lazily; decoding happens while joining
+            segments = self._faster_whisper_segments(audio)
+            return "".join(segment.text for segment in segments).strip()
+        
+        result = self.model.transcribe(
+            audio,
+            language="en",  # Can be None for auto-detection
+            fp16=self.model.device.type == "cuda"  # fp32 on CPU
+        )
+        return result["text"].strip()
+    
+    def _faster_whisper_segments(self, audio: Union[str, BinaryIO]):
+        """Lazy segment iterator from faster-whisper, batched when configured"""
+        if self._batched is not None:
+            segments, _ = self._batched.transcribe(
+                audio,
+                language="en",
+                batch_size=settings.WHISPER_BATCH_SIZE
+            )
+        else:
+            segments, _ = self.model.transcribe(audio, language="en")
+        return segments
+    
+    async def _transcribe_groq(self, audio: Union[str, Tuple[str, BinaryIO]]) -> str:
+        """Transcribe a file path or (filename, file object) using Groq Whisper API (FREE tier)"""
         try:
-            from groq import Groq
-            
-            client = Groq(api_key=settings.GROQ_API_KEY)
+            if self._client is None:
+                from groq import AsyncGroq
+                self._client = AsyncGroq(api_key=settings.GROQ_API_KEY)
             
-            with open(audio_file_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-large-v3",
-                    language="en"
-                )
+            transcription = await self._client.audio.transcriptions.create(
+                file=_api_audio(audio),
+                model="whisper-large-v3",
+                language="en"
+            )
             
             text = transcription.text.strip()
             logger.info(f"Groq transcription: {text}")
@@ -135,19 +345,18 @@ class VoiceInputService:
             logger.error(f"Groq transcription failed: {e}")
             raise
     
-    async def _transcribe_openai(self, audio_file_path: str) -> str:
-        """Transcribe using OpenAI Whisper API"""
+    async def _transcribe_openai(self, audio: Union[str, Tuple[str, BinaryIO]]) -> str:
+        """Transcribe a file path or (filename, file object) using OpenAI Whisper API"""
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            if self._client is None:
+                from openai import AsyncOpenAI
+                self._client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
             
-            with open(audio_file_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="en"
-                )
+            transcription = await self._client.audio.transcriptions.create(
+                model="whisper-1",
+                file=_api_audio(audio),
+                language="en"
+            )
             
             text = transcription.text.strip()
             logger.info(f"OpenAI transcription: {text}")
@@ -171,9 +380,47 @@ class VoiceInputService:
         Returns:
             Transcribed text
         """
-        # Save bytes to temporary file
+        return await self.transcribe_audio_stream(io.BytesIO(audio_bytes), format)
+    
+    async def transcribe_audio_stream(self, source: BinaryIO, format: str = "wav") -> str:
+        """
+        Transcribe audio from a readable file object without loading it into memory first.
+        
+        Args:
+            source: Binary file object positioned at the start of the audio (e.g. UploadFile.file)
+            format: Audio format (wav, mp3, m4a, etc.)
+        
+        Returns:
+            Transcribed text
+        """
+        key = (self.mode, await asyncio.to_thread(_hash_audio, source))
+        text = _transcription_cache.get(key)
+        if text is None:
+            text = await self._transcribe_stream(source, format)
+            _transcription_cache[key] = text
+        else:
+            logger.info("✓ Transcription cache hit")
+        return text
+    
+    async def _transcribe_stream(self, source: BinaryIO, format: str) -> str:
+        """Transcribe a file object with the configured backend (uncached)"""
+        # The API clients and faster-whisper read the audio straight from the file object
+        if self.mode == "groq":
+            return await self._transcribe_groq((f"audio.{format}", source))
+        if self.mode == "openai":
+            return await self._transcribe_openai((f"audio.{format}", source))
+        if self.mode == "local" and self._faster_whisper:
+            return await self._transcribe_local(source)
+        
+        # openai-whisper takes 16 kHz float PCM; decode it with ffmpeg over pipes
+        if FFMPEG_PATH and format.lower() not in _SEEK_REQUIRED_FORMATS:
+            pcm = await asyncio.to_thread(_decode_pcm, source)
+            return await self._transcribe_local(pcm)
+        
+        # Otherwise let whisper's own ffmpeg call read a file on disk
         with tempfile.NamedTemporaryFile(suffix=f".{format}", delete=False) as temp_file:
-            temp_file.write(audio_bytes)
+            # Copy in 1 MiB chunks on a worker thread
+            await asyncio.to_thread(shutil.copyfileobj, source, temp_file, 1 << 20)
             temp_path = temp_file.name
         
         try:
@@ -187,6 +434,43 @@ class VoiceInputService:
             except:
                 pass
     
+    async def stream_transcription(self, source: BinaryIO, format: str = "wav") -> AsyncIterator[str]:
+        """
+        Yield transcript text segment by segment as it is decoded.
+        
+        Reads from a file object like transcribe_audio_stream and shares its
+        cache. Only local faster-whisper decodes incrementally; cache hits and
+        the other backends yield the whole transcript at once.
+        """
+        if not (self.mode == "local" and self._faster_whisper):
+            yield await self.transcribe_audio_stream(source, format)
+            return
+        
+        key = (self.mode, await asyncio.to_thread(_hash_audio, source))
+        text = _transcription_cache.get(key)
+        if text is not None:
+            logger.info("✓ Transcription cache hit")
+            yield text
+            return
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        def produce():
+            try:
+                for segment in self._faster_whisper_segments(source):
+                    loop.call_soon_threadsafe(queue.put_nowait, segment.text)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+        
+        decoding = loop.run_in_executor(self._whisper_executor, produce)
+        parts = []
+        while (text := await queue.get()) is not None:
+            parts.append(text)
+            yield text
+        await decoding  # Surface decoding errors
+        _transcription_cache[key] = "".join(parts).strip()
+    
     def record_audio(
         self,
         duration: int = 5,
@@ -237,12 +521,9 @@ class VoiceInputService:
 
 
 # ============================================
-# Singleton Instance
+# Singleton Instances
 # ============================================
 
-_voice_service: Optional[VoiceInputService] = None
-
-
 def get_voice_service(mode: str = None) -> VoiceInputService:
     """
     Get voice input service singleton.
@@ -251,25 +532,29 @@ def get_voice_service(mode: str = None) -> VoiceInputService:
     1. Groq (if GROQ_API_KEY set) - FREE + Fast
     2. OpenAI (if OPENAI_API_KEY set) - Paid
     3. Local (if whisper installed) - FREE + Slow
-    """
-    global _voice_service
-    
-    # Auto-detect mode if not specified
-    if mode is None:
-        if hasattr(settings, 'GROQ_API_KEY') and settings.GROQ_API_KEY:
-            mode = "groq"
-            logger.info("Auto-selected Groq for voice transcription (FREE)")
-        elif hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
-            mode = "openai"
-            logger.info("Auto-selected OpenAI for voice transcription")
-        else:
-            mode = "local"
-            logger.info("Auto-selected local Whisper for voice transcription")
-    
-    if _voice_service is None or _voice_service.mode != mode:
-        _voice_service = VoiceInputService(mode=mode)
     
-    return _voice_service
+    One service is kept per mode, so a Whisper model is loaded once per process.
+    """
+    return _voice_service_for(mode or _default_mode())
+
+
+@lru_cache(maxsize=1)
+def _default_mode() -> str:
+    """Pick the transcription mode from the configured API keys"""
+    if hasattr(settings, 'GROQ_API_KEY') and settings.GROQ_API_KEY:
+        logger.info("Auto-selected Groq for voice transcription (FREE)")
+        return "groq"
+    if hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
+        logger.info("Auto-selected OpenAI for voice transcription")
+        return "openai"
+    logger.info("Auto-selected local Whisper for voice transcription")
+    return "local"
+
+
+@lru_cache(maxsize=4)
+def _voice_service_for(mode: str) -> VoiceInputService:
+    """Service for one mode (failed initializations are not cached)"""
+    return VoiceInputService(mode=mode)
 
 
 # ============================================
@@ -5,15 +5,27 @@ Voice API Endpoints
 REST endpoints for voice input processing.
 """
 
+import time
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
-from backend.api.voice import get_voice_service, VoiceInputService
+from backend.api.voice import (
+    get_voice_service,
+    clear_transcription_cache,
+    transcribe_recording,
+    VoiceInputService
+)
+from backend.config import settings
 from backend.utils.logger import get_logger
 
 logger = get_logger("voice_api")
-router = APIRouter(prefix="/voice", tags=["voice"])
+router = APIRouter(prefix="/voice", tags=["voice"], default_response_class=ORJSONResponse)
+
+# Formats accepted by the Whisper APIs (local Whisper decodes them all via ffmpeg)
+_SUPPORTED_AUDIO_FORMATS = frozenset({"wav", "mp3", "m4a", "webm", "ogg", "flac", "mp4", "mpeg", "mpga"})
+_AUDIO_MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # Groq/OpenAI transcription upload limit
 
 
 # ============================================
@@ -44,7 +56,7 @@ async def transcribe_audio(
     """
     Transcribe uploaded audio file to text.
     
-    Supports: wav, mp3, m4a, webm, ogg
+    Supports: wav, mp3, m4a, webm, ogg, flac, mp4, mpeg, mpga (max 25 MB)
     
     Automatically detects best transcription method:
     - Groq API (if GROQ_API_KEY set) - FREE + Fast
@@ -54,29 +66,25 @@ async def transcribe_audio(
     Parameters:
         audio_file: Audio file to transcribe
     """
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter()
+    
+    # Reject unsupported or oversized uploads before any transcription work
+    filename = audio_file.filename or "audio.wav"
+    format = check_audio_upload(audio_file, filename)
     
     try:
         # Get voice service (auto-detects best mode)
         voice_service = get_voice_service()
         
-        # Read audio bytes
-        audio_bytes = await audio_file.read()
-        
-        # Get file extension
-        filename = audio_file.filename or "audio.wav"
-        format = filename.split(".")[-1] if "." in filename else "wav"
+        logger.info(f"Transcribing audio file: {filename} ({audio_file.size} bytes) using {voice_service.mode} mode")
         
-        logger.info(f"Transcribing audio file: {filename} ({len(audio_bytes)} bytes) using {voice_service.mode} mode")
-        
-        # Transcribe
-        text = await voice_service.transcribe_audio_bytes(
-            audio_bytes,
+        # Transcribe straight from the spooled upload (no full read into memory)
+        text = await voice_service.transcribe_audio_stream(
+            audio_file.file,
             format=format
         )
         
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
         
         logger.info(f"✓ Transcription complete: {text}")
         
@@ -109,8 +117,7 @@ async def record_and_transcribe(
         duration: Recording duration in seconds (1-30)
         mode: Transcription mode (local, groq, openai)
     """
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     # Validate duration
     if not (1 <= duration <= 30):
@@ -120,14 +127,12 @@ async def record_and_transcribe(
         )
     
     try:
-        from backend.api.voice import transcribe_recording
-        
         logger.info(f"Recording audio for {duration} seconds...")
         
         # Record and transcribe
         text = await transcribe_recording(duration, mode)
         
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
         
         return TranscriptionResponse(
             text=text,
@@ -143,6 +148,18 @@ async def record_and_transcribe(
         )
 
 
+async def clear_cache():
+    """Drop cached transcripts (e.g. after switching Whisper models)"""
+    cleared = clear_transcription_cache()
+    logger.info(f"✓ Cleared {cleared} cached transcriptions")
+    return {"cleared": cleared}
+
+
+# Unauthenticated and process-wide, so only exposed in debug mode
+if settings.DEBUG:
+    router.add_api_route("/cache/clear", clear_cache, methods=["POST"])
+
+
 @router.get("/health")
 async def voice_health_check():
     """Check if voice service is available"""
@@ -158,3 +175,23 @@ async def voice_health_check():
             "status": "unhealthy",
             "error": str(e)
         }
+
+
+# ============================================
+# Helper Functions
+# ============================================
+
+def check_audio_upload(audio_file: UploadFile, filename: str) -> str:
+    """Return the upload's audio format, rejecting unsupported (415) or oversized (413) files"""
+    format = filename.rsplit(".", 1)[-1].lower() if "." in filename else "wav"
+    if format not in _SUPPORTED_AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported audio format '{format}'. Supported: {', '.join(sorted(_SUPPORTED_AUDIO_FORMATS))}"
+        )
+    if audio_file.size is not None and audio_file.size > _AUDIO_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio file too large (max {_AUDIO_MAX_UPLOAD_BYTES // (1024 * 1024)} MB)"
+        )
+    return format
@@ -8,19 +8,20 @@ Uses environment variables with fallback defaults.
 
 import os
 from typing import Optional
-from pydantic import Field, ConfigDict
-from pydantic_settings import BaseSettings
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
     
-    model_config = ConfigDict(
+    model_config = SettingsConfigDict(
         extra='ignore',
         env_file='.env',
         env_file_encoding='utf-8',
-        case_sensitive=True
+        case_sensitive=True,
+        frozen=True  # Validated once at startup, then read-only
     )
     
     # ============================================
@@ -36,6 +37,9 @@ class Settings(BaseSettings):
     # ============================================
     API_HOST: str = Field(default="0.0.0.0", env="API_HOST")
     API_PORT: int = Field(default=8000, env="API_PORT")
+    # Server processes for `python -m backend.main` (the uvicorn CLI reads the same variable).
+    # Kept small: each worker loads its own local Whisper model when no API key is set
+    WEB_CONCURRENCY: int = Field(default=2, env="WEB_CONCURRENCY")
     API_PREFIX: str = "/api/v1"
     CORS_ORIGINS: list = [
         "http://localhost:3000", 
@@ -63,10 +67,13 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = Field(default="http://localhost:11434", env="OLLAMA_BASE_URL")
     OLLAMA_MODEL_EXTRACTION: str = Field(default="llama3.2", env="OLLAMA_MODEL_EXTRACTION")
     OLLAMA_MODEL_VALIDATION: str = Field(default="llama3.2", env="OLLAMA_MODEL_VALIDATION")
+    OLLAMA_STRUCTURED_OUTPUTS: bool = Field(default=True, env="OLLAMA_STRUCTURED_OUTPUTS")  # Schema-constrained decoding (Ollama 0.5+)
     
     # Groq settings (cloud)
     GROQ_API_KEY: Optional[str] = Field(None, env="GROQ_API_KEY")
     GROQ_MODEL: str = Field(default="llama-3.1-8b-instant", env="GROQ_MODEL")
+    GROQ_REQUESTS_PER_MINUTE: int = Field(default=30, env="GROQ_REQUESTS_PER_MINUTE")  # Your tier's limits; 0 disables
+    GROQ_TOKENS_PER_MINUTE: int = Field(default=6000, env="GROQ_TOKENS_PER_MINUTE")
     
     # OpenAI settings (cloud)
     OPENAI_API_KEY: Optional[str] = Field(None, env="OPENAI_API_KEY")
@@ -76,14 +83,25 @@ class Settings(BaseSettings):
     LLM_TEMPERATURE: float = 0.1  # Low temperature for structured outputs
     LLM_MAX_TOKENS: int = 500
     LLM_TIMEOUT: int = 30  # seconds
+    LLM_MAX_CONCURRENCY: int = 4  # Max in-flight generations per client (match OLLAMA_NUM_PARALLEL for Ollama)
+    LLM_MAX_RETRIES: int = 3  # Retries on 429/503 from hosted providers
+    EXTRACTION_CONFIDENCE_SKIP_THRESHOLD: float = 0.9  # Confident, well-formed extractions skip LLM validation
+    LLM_FAST_PATH: bool = False  # Parse obvious inputs ("uber 15") with keyword rules instead of the LLM
+    LLM_UNIFIED_PIPELINE: bool = True  # One combined extract+validate call; False runs the two-stage baseline
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60  # Reuse results for identical inputs
+    LLM_CACHE_MAX_ENTRIES: int = 4096
     
     # ============================================
     # Voice Input Configuration (Whisper)
     # ============================================
     WHISPER_MODEL: str = Field(default="base", env="WHISPER_MODEL")  # tiny, base, small, medium, large
+    WHISPER_BACKEND: str = Field(default="openai-whisper", env="WHISPER_BACKEND")  # openai-whisper, faster-whisper (int8)
+    WHISPER_WORKERS: int = max(1, (os.cpu_count() or 1) // 4)  # Parallel faster-whisper transcriptions (4 threads each)
+    WHISPER_BATCH_SIZE: int = 8  # faster-whisper windows decoded per batch (1 disables batching)
     WHISPER_LANGUAGE: str = "en"
     AUDIO_SAMPLE_RATE: int = 16000
     MAX_AUDIO_LENGTH: int = 60  # seconds
+    TRANSCRIPTION_CACHE_MAX_ENTRIES: int = 512  # Resent clips skip Whisper entirely
     
     # ============================================
     # Cost of Living API
@@ -98,6 +116,7 @@ class Settings(BaseSettings):
     
     # Cache settings
     COST_DATA_CACHE_HOURS: int = 24 * 30  # Cache for 30 days
+    REDIS_URL: Optional[str] = Field(default=None, env="REDIS_URL")  # Shared cache across workers (optional)
     
     # ============================================
     # Authentication Settings
@@ -137,8 +156,8 @@ def get_settings() -> Settings:
     return Settings()
 
 
-# Global settings instance
-settings = get_settings()
+# Global settings instance (the same object get_settings() returns)
+settings: Settings = get_settings()
 
 
 # ============================================
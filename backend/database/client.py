@@ -5,46 +5,71 @@ Supabase Database Client
 Wrapper for Supabase operations.
 """
 
-from typing import Dict, Any, List, Optional
-from supabase import create_client, Client
+import asyncio
+from cachetools import TTLCache
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+from supabase import acreate_client, AsyncClient
 from backend.config import settings
 from backend.utils.logger import get_logger
 
 logger = get_logger("database")
 
+# Recently fetched user rows, keyed by ("id", id) and ("username", username);
+# users rarely change and are looked up on every authenticated request
+_USER_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# Users whose last_login was written recently (at most one write per user per minute)
+_LAST_LOGIN_WRITES: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# Receipt jobs are polled shortly after upload; older ones are expired and
+# purged (at most once an hour per process)
+RECEIPT_JOB_TTL = timedelta(days=1)
+_RECEIPT_JOB_PURGES: TTLCache = TTLCache(maxsize=1, ttl=3600)
+
+# Expense columns for list views (leaves out raw_input and the LLM JSON blobs)
+EXPENSE_LIST_COLUMNS = "id,user_id,amount,category,description,expense_date,input_method,created_at"
+
 
 class SupabaseClient:
     """Wrapper for Supabase database operations"""
     
     _instance: Optional['SupabaseClient'] = None
-    _client: Optional[Client] = None
+    _client: Optional[AsyncClient] = None
+    _init_lock = asyncio.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        if self._client is None:
-            self._initialize_client()
+    async def initialize(self):
+        """Create the async Supabase client on first use"""
+        if self._client is not None:
+            return
+        async with self._init_lock:
+            if self._client is None:
+                await self._initialize_client()
     
-    def _initialize_client(self):
+    async def _initialize_client(self):
         """Initialize Supabase client"""
         try:
-            self._client = create_client(
+            client = await acreate_client(
                 settings.SUPABASE_URL,
                 settings.SUPABASE_KEY
             )
+            self._client = client
             logger.info("✓ Supabase client initialized")
         except Exception as e:
             logger.error(f"✗ Failed to initialize Supabase client: {e}")
             raise
     
     @property
-    def client(self) -> Client:
-        """Get the Supabase client"""
+    def client(self) -> AsyncClient:
+        """Get the Supabase client (call initialize() first)"""
         if self._client is None:
-            self._initialize_client()
+            raise RuntimeError("Supabase client not initialized; use 'await get_database()'")
         return self._client
     
     # ============================================
@@ -53,10 +78,13 @@ class SupabaseClient:
     
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username"""
+        cached = _USER_CACHE.get(("username", username))
+        if cached is not None:
+            return dict(cached)
         try:
-            response = self.client.table("users").select("*").eq("username", username).execute()
+            response = await self.client.table("users").select("*").eq("username", username).execute()
             if response.data and len(response.data) > 0:
-                return response.data[0]
+                return _remember_user(response.data[0])
             return None
         except Exception as e:
             logger.error(f"Error fetching user: {e}")
@@ -69,33 +97,40 @@ class SupabaseClient:
             if display_name:
                 data["display_name"] = display_name
             
-            response = self.client.table("users").insert(data).execute()
+            response = await self.client.table("users").insert(data).execute()
             logger.info(f"✓ Created user: {username}")
-            return response.data[0]
+            return _remember_user(response.data[0])
         except Exception as e:
             logger.error(f"Error creating user: {e}")
             raise
     
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
+        cached = _USER_CACHE.get(("id", user_id))
+        if cached is not None:
+            return dict(cached)
         try:
-            response = self.client.table("users").select("*").eq("id", user_id).execute()
+            response = await self.client.table("users").select("*").eq("id", user_id).execute()
             if response.data and len(response.data) > 0:
-                return response.data[0]
+                return _remember_user(response.data[0])
             return None
         except Exception as e:
             logger.error(f"Error fetching user by ID: {e}")
             return None
     
     async def update_user_last_login(self, user_id: str) -> bool:
-        """Update user's last login timestamp"""
+        """Update user's last login timestamp (debounced to one write per minute)"""
+        if user_id in _LAST_LOGIN_WRITES:
+            return True
         try:
-            from datetime import datetime
-            self.client.table("users").update({
-                "last_login": datetime.now().isoformat()
+            _LAST_LOGIN_WRITES[user_id] = True
+            await self.client.table("users").update({
+                "last_login": datetime.now(timezone.utc).isoformat()
             }).eq("id", user_id).execute()
+            _forget_user(user_id)
             return True
         except Exception as e:
+            _LAST_LOGIN_WRITES.pop(user_id, None)  # Let the next login retry
             logger.error(f"Error updating last login: {e}")
             return False
     
@@ -129,28 +164,87 @@ class SupabaseClient:
                 "llm_validated": llm_validated
             }
             
-            response = self.client.table("expenses").insert(data).execute()
+            response = await self.client.table("expenses").insert(data).execute()
             logger.info(f"✓ Added expense: {amount} for {category}")
             return response.data[0]
         except Exception as e:
             logger.error(f"Error adding expense: {e}")
             raise
     
+    async def add_expense_with_calendar(
+        self,
+        user_id: str,
+        amount: float,
+        category: str,
+        description: str,
+        expense_date: str,
+        calendar_title: str,
+        input_method: str = "text",
+        raw_input: Optional[str] = None,
+        llm_extracted: Optional[Dict] = None,
+        llm_validated: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Add a new expense and its calendar entry in a single round trip"""
+        try:
+            response = await self.client.rpc(
+                "add_expense_with_calendar",
+                {
+                    "uid": user_id,
+                    "amt": amount,
+                    "cat": category,
+                    "descr": description,
+                    "exp_date": expense_date,
+                    "entry_title": calendar_title,
+                    "method": input_method,
+                    "raw": raw_input,
+                    "extracted": llm_extracted,
+                    "validated": llm_validated
+                }
+            ).execute()
+            logger.info(f"✓ Added expense with calendar entry: {amount} for {category}")
+            return response.data[0]
+        except Exception as e:
+            logger.error(f"Error adding expense with calendar entry: {e}")
+            raise
+    
+    async def add_expenses_with_calendar_bulk(
+        self,
+        expenses: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Add several expenses (expenses table rows) and their calendar entries in one round trip"""
+        try:
+            response = await self.client.rpc(
+                "add_expenses_with_calendar_bulk", {"items": expenses}
+            ).execute()
+            logger.info(f"✓ Added {len(response.data)} expenses with calendar entries")
+            return response.data
+        except Exception as e:
+            logger.error(f"Error adding expenses in bulk: {e}")
+            raise
+    
     async def get_user_expenses(
         self,
         user_id: str,
         limit: int = 100,
-        offset: int = 0
+        before: Optional[Tuple[date, UUID]] = None,
+        columns: str = EXPENSE_LIST_COLUMNS
     ) -> List[Dict[str, Any]]:
-        """Get expenses for a user"""
+        """
+        Get expenses for a user, newest first.
+        
+        Pages with a keyset cursor instead of OFFSET: pass the (expense_date, id)
+        of the last row received as `before` to get the next page.
+        """
         try:
-            response = (
-                self.client.table("expenses")
-                .select("*")
-                .eq("user_id", user_id)
+            query = self.client.table("expenses").select(columns).eq("user_id", user_id)
+            if before:
+                query = query.or_(_keyset_filter(before))
+            
+            response = await (
+                query
                 .order("expense_date", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
-                .offset(offset)
                 .execute()
             )
             return response.data
@@ -158,6 +252,136 @@ class SupabaseClient:
             logger.error(f"Error fetching expenses: {e}")
             return []
     
+    async def get_user_expenses_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        offset: int = 0,
+        category: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: str = EXPENSE_LIST_COLUMNS,
+        before: Optional[Tuple[date, UUID]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get one page of a user's expenses plus the count matching the filters.
+        
+        With `before` (the expense_date and id of the last row received) the
+        page starts after that row via the (user_id, expense_date, id) index
+        and `offset` is ignored, so deep pages cost the same as the first.
+        The count then covers only the rows from the cursor on.
+        """
+        try:
+            query = (
+                self.client.table("expenses")
+                .select(columns, count="exact")
+                .eq("user_id", user_id)
+            )
+            if category:
+                query = query.eq("category", category)
+            if start_date:
+                query = query.gte("expense_date", start_date.isoformat())
+            if end_date:
+                query = query.lte("expense_date", end_date.isoformat())
+            if before:
+                query = query.or_(_keyset_filter(before))
+            
+            query = (
+                query
+                .order("expense_date", desc=True)
+                .order("id", desc=True)
+                .limit(limit)
+            )
+            if not before:
+                query = query.offset(offset)
+            
+            response = await query.execute()
+            return response.data, response.count or 0
+        except Exception as e:
+            logger.error(f"Error fetching expenses: {e}")
+            return [], 0
+    
+    async def get_user_spending_by_category(
+        self,
+        user_id: str,
+        category: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Get total spending per category for a user (aggregated in the database)"""
+        try:
+            params = {"uid": user_id}
+            if category:
+                params["cat"] = category
+            
+            response = await self.client.rpc("sum_expenses_by_category", params).execute()
+            return {row["category"]: float(row["total"]) for row in response.data}
+        except Exception as e:
+            logger.error(f"Error fetching spending by category: {e}")
+            return {}
+    
+    async def get_spending_by_category_bulk(
+        self,
+        user_ids: List[str]
+    ) -> Dict[str, Dict[str, float]]:
+        """Get per-category spending for several users in one query ({user_id: {category: total}})"""
+        spending: Dict[str, Dict[str, float]] = {user_id: {} for user_id in user_ids}
+        try:
+            response = await self.client.rpc(
+                "sum_expenses_by_user_category", {"uids": user_ids}
+            ).execute()
+            for row in response.data:
+                spending.setdefault(str(row["user_id"]), {})[row["category"]] = float(row["total"])
+        except Exception as e:
+            logger.error(f"Error fetching bulk spending by category: {e}")
+        return spending
+    
+    async def get_expense_summary(
+        self,
+        user_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Get expense totals, category breakdown and date range (aggregated in the database)"""
+        try:
+            params = {"uid": user_id}
+            if start_date:
+                params["start_date"] = start_date.isoformat()
+            if end_date:
+                params["end_date"] = end_date.isoformat()
+            
+            response = await self.client.rpc("summarize_expenses_by_category", params).execute()
+            rows = response.data
+        except Exception as e:
+            logger.error(f"Error fetching expense summary: {e}")
+            rows = []
+        
+        return {
+            "total_amount": sum(float(row["total"]) for row in rows),
+            "expense_count": sum(row["expense_count"] for row in rows),
+            "category_breakdown": {row["category"]: float(row["total"]) for row in rows},
+            "date_range": {
+                "start": min((row["first_date"] for row in rows), default=None),
+                "end": max((row["last_date"] for row in rows), default=None)
+            }
+        }
+    
+    async def get_spent(
+        self,
+        user_id: str,
+        category: str,
+        period_start: Optional[date] = None
+    ) -> float:
+        """Get total spending in one category since period_start (aggregated in the database)"""
+        try:
+            params = {"uid": user_id, "cat": category}
+            if period_start:
+                params["since"] = period_start.isoformat()
+            
+            response = await self.client.rpc("sum_expenses_by_category", params).execute()
+            return float(response.data[0]["total"]) if response.data else 0.0
+        except Exception as e:
+            logger.error(f"Error fetching category spending: {e}")
+            return 0.0
+    
     # ============================================
     # Budget Operations
     # ============================================
@@ -169,39 +393,13 @@ class SupabaseClient:
         amount: float,
         period: str = "monthly"
     ) -> Dict[str, Any]:
-        """Set or update a budget"""
+        """Set or update a budget (one round trip via the upsert_budget function)"""
         try:
-            # Check if budget exists
-            existing = (
-                self.client.table("budgets")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("category", category)
-                .eq("period", period)
-                .execute()
-            )
-            
-            data = {
-                "user_id": user_id,
-                "category": category,
-                "amount": amount,
-                "period": period
-            }
-            
-            if existing.data and len(existing.data) > 0:
-                # Update existing
-                response = (
-                    self.client.table("budgets")
-                    .update({"amount": amount})
-                    .eq("id", existing.data[0]["id"])
-                    .execute()
-                )
-                logger.info(f"✓ Updated budget: {category} to {amount}")
-            else:
-                # Create new
-                response = self.client.table("budgets").insert(data).execute()
-                logger.info(f"✓ Created budget: {category} = {amount}")
-            
+            response = await self.client.rpc(
+                "upsert_budget",
+                {"uid": user_id, "cat": category, "amt": amount, "per": period}
+            ).execute()
+            logger.info(f"✓ Set budget: {category} = {amount}")
             return response.data[0]
         except Exception as e:
             logger.error(f"Error setting budget: {e}")
@@ -210,7 +408,7 @@ class SupabaseClient:
     async def get_user_budgets(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all budgets for a user"""
         try:
-            response = (
+            response = await (
                 self.client.table("budgets")
                 .select("*")
                 .eq("user_id", user_id)
@@ -221,6 +419,54 @@ class SupabaseClient:
             logger.error(f"Error fetching budgets: {e}")
             return []
     
+    async def list_budgets_with_spent(
+        self,
+        user_id: str,
+        since: Dict[str, date],
+        default_since: date
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all budgets for a user with their category spending, in one query.
+        
+        Each row's `spent` covers its budget's own period (`since` maps
+        period -> window start) and `category_spent` covers the category
+        since default_since. Categories with spending but no budget are
+        included with id None.
+        """
+        try:
+            params = {
+                "uid": user_id,
+                "since": {period: start.isoformat() for period, start in since.items()},
+                "default_since": default_since.isoformat()
+            }
+            response = await self.client.rpc("list_budgets_with_spent", params).execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching budgets with spending: {e}")
+            return []
+    
+    async def get_budget(
+        self,
+        user_id: str,
+        category: str,
+        period: str = "monthly"
+    ) -> Optional[Dict[str, Any]]:
+        """Get a single budget by (user, category, period)"""
+        try:
+            response = await (
+                self.client.table("budgets")
+                .select("*")
+                .eq("user_id", user_id)
+                .eq("category", category)
+                .eq("period", period)
+                .limit(1)
+                .execute()
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error fetching budget: {e}")
+            return None
+    
     # ============================================
     # Calendar Operations
     # ============================================
@@ -247,23 +493,131 @@ class SupabaseClient:
                 "category": category
             }
             
-            response = self.client.table("calendar_entries").insert(data).execute()
+            response = await self.client.table("calendar_entries").insert(data).execute()
             logger.info(f"✓ Added calendar entry: {title}")
             return response.data[0]
         except Exception as e:
             logger.error(f"Error adding calendar entry: {e}")
             raise
 
+    
+    # ============================================
+    # Receipt Job Operations
+    # ============================================
+    
+    async def create_receipt_job(self, job_id: str, user_id: str) -> Dict[str, Any]:
+        """Create a pending receipt parsing job owned by user_id"""
+        try:
+            response = await self.client.table("receipt_jobs").insert({
+                "id": job_id,
+                "user_id": user_id,
+                "status": "pending"
+            }).execute()
+            return response.data[0]
+        except Exception as e:
+            logger.error(f"Error creating receipt job: {e}")
+            raise
+    
+    async def update_receipt_job(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Record the status (and result or error) of a receipt job"""
+        try:
+            await self.client.table("receipt_jobs").update({
+                "status": status,
+                "result": result,
+                "error": error
+            }).eq("id", job_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating receipt job: {e}")
+            return False
+    
+    async def get_receipt_job(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a receipt job by ID (None if it belongs to another user or has expired)"""
+        try:
+            cutoff = datetime.now(timezone.utc) - RECEIPT_JOB_TTL
+            response = await (
+                self.client.table("receipt_jobs")
+                .select("*")
+                .eq("id", job_id)
+                .eq("user_id", user_id)
+                .gte("created_at", cutoff.isoformat())
+                .execute()
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error fetching receipt job: {e}")
+            return None
+    
+    async def purge_expired_receipt_jobs(self) -> int:
+        """Delete receipt jobs older than RECEIPT_JOB_TTL (debounced to once an hour)"""
+        if "purge" in _RECEIPT_JOB_PURGES:
+            return 0
+        try:
+            _RECEIPT_JOB_PURGES["purge"] = True
+            response = await self.client.rpc(
+                "purge_expired_receipt_jobs",
+                {"max_age": f"{int(RECEIPT_JOB_TTL.total_seconds())} seconds"}
+            ).execute()
+            return response.data or 0
+        except Exception as e:
+            _RECEIPT_JOB_PURGES.pop("purge", None)  # Let the next upload retry
+            logger.error(f"Error purging receipt jobs: {e}")
+            return 0
+
+
+# ============================================
+# Query Helpers
+# ============================================
+
+def _keyset_filter(before: Tuple[date, UUID]) -> str:
+    """
+    PostgREST filter for rows ordered after (expense_date, id), newest first.
+    Both values are parsed before they go into the filter string, so a bad
+    cursor raises ValueError instead of adding filter terms.
+    """
+    before_date = date.fromisoformat(str(before[0])).isoformat()
+    before_id = UUID(str(before[1]))
+    return f"expense_date.lt.{before_date},and(expense_date.eq.{before_date},id.lt.{before_id})"
+
+
+# ============================================
+# User Cache Helpers
+# ============================================
+
+def _remember_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache a user row under its id and username, returning a copy for the caller"""
+    _USER_CACHE[("id", str(user["id"]))] = user
+    _USER_CACHE[("username", user["username"])] = user
+    return dict(user)
+
+
+def _forget_user(user_id: str):
+    """Drop a user's cached row (both keys)"""
+    user = _USER_CACHE.pop(("id", str(user_id)), None)
+    if user is not None:
+        _USER_CACHE.pop(("username", user["username"]), None)
+
 
 # ============================================
 # Singleton Instance
 # ============================================
 
+_database = SupabaseClient()
+
+
 def get_db() -> SupabaseClient:
-    """Get database client singleton"""
-    return SupabaseClient()
+    """Get database client singleton (not initialized; prefer get_database)"""
+    return _database
 
 
 async def get_database() -> SupabaseClient:
-    """Get database client singleton (async version for FastAPI dependency)"""
-    return SupabaseClient()
+    """Get the initialized database client singleton (async version for FastAPI dependency)"""
+    if _database._client is None:
+        await _database.initialize()
+    return _database
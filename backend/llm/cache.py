@@ -0,0 +1,69 @@
+# CHECKPOINT_5_LLM_PIPELINE
+"""
+LLM Result Cache
+================
+Content-addressed cache for LLM outputs, so repeating an identical
+input ("coffee $5") skips the model call entirely.
+
+Lookups hit an in-process cache first, then Redis (when REDIS_URL is
+set) so every worker shares results.
+"""
+
+import hashlib
+import orjson
+from cachetools import TTLCache
+from typing import Any, Optional
+from backend.config import settings
+from backend.utils.logger import get_logger
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = get_logger("llm_cache")
+
+# Values are stored serialized so every hit hands back a fresh copy
+_CACHE: TTLCache = TTLCache(
+    maxsize=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL_SECONDS
+)
+
+_REDIS_PREFIX = "llm:"
+
+if settings.REDIS_URL and REDIS_AVAILABLE:
+    _redis = aioredis.from_url(settings.REDIS_URL)
+else:
+    _redis = None
+    if settings.REDIS_URL:
+        logger.warning("REDIS_URL is set but redis is not installed; using in-process LLM cache only")
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from the parts that determine the LLM output"""
+    return hashlib.sha256(b"\x00".join(part.encode() for part in parts)).hexdigest()
+
+
+async def get(key: str) -> Optional[Any]:
+    """Get a cached result (None on miss)"""
+    raw = _CACHE.get(key)
+    if raw is None and _redis is not None:
+        try:
+            raw = await _redis.get(_REDIS_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Redis LLM cache read failed: {e}")
+        if raw is not None:
+            _CACHE[key] = raw
+    return orjson.loads(raw) if raw is not None else None
+
+
+async def put(key: str, value: Any):
+    """Cache a JSON-serializable result"""
+    raw = orjson.dumps(value)
+    _CACHE[key] = raw
+    if _redis is not None:
+        try:
+            await _redis.set(_REDIS_PREFIX + key, raw, ex=int(settings.LLM_CACHE_TTL_SECONDS))
+        except Exception as e:
+            logger.warning(f"Redis LLM cache write failed: {e}")
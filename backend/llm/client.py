@@ -5,19 +5,94 @@ LLM Client Module
 Unified client for different LLM providers (Ollama, Groq, OpenAI).
 """
 
-import json
-from typing import Dict, Any, Optional, List
+import asyncio
+import random
+import orjson
+from functools import lru_cache
+from typing import Dict, Any, Optional, AsyncIterator, Tuple
 from abc import ABC, abstractmethod
 import httpx
 from backend.config import settings
+from backend.llm.schemas import compact_schema
+from backend.llm.throttle import AsyncRateLimiter
 from backend.utils.logger import get_logger
 
 logger = get_logger("llm_client")
 
 
+def _create_http_client(http2: bool) -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client shared by all calls of one LLM client.
+    Over HTTP/2 concurrent calls multiplex on one connection, so only a
+    few need to be kept alive; HTTP/1.1 needs one per in-flight call.
+    """
+    keepalive = 4 if http2 else max(settings.LLM_MAX_CONCURRENCY, 4)
+    return httpx.AsyncClient(
+        timeout=settings.LLM_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=keepalive),
+        http2=http2,
+        # Bodies are encoded with orjson and sent as raw content
+        headers={"Content-Type": "application/json"}
+    )
+
+
+# Serialized schemas, keyed by id(); the schema itself is kept alongside so
+# the id cannot be reused by another object
+_SCHEMA_TEXT: Dict[int, Tuple[Dict[str, Any], str]] = {}
+
+
+def _with_schema(system_prompt: Optional[str], schema: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Append the JSON schema to the system prompt. It is static per call type,
+    so keeping it there (rather than after the user input) leaves the whole
+    prefix byte-identical across requests for provider-side prompt caching.
+    Descriptions are stripped; the structure is what the model needs.
+    """
+    if not schema:
+        return system_prompt
+    cached = _SCHEMA_TEXT.get(id(schema))
+    if cached is None or cached[0] is not schema:
+        text = orjson.dumps(compact_schema(schema), option=orjson.OPT_INDENT_2).decode()
+        cached = _SCHEMA_TEXT[id(schema)] = (schema, text)
+    return f"{system_prompt or ''}\n\nJSON Schema:\n{cached[1]}"
+
+
+def _estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Rough token cost of a chat request (~4 characters per token, plus the output budget)"""
+    prompt_chars = sum(len(message["content"]) for message in payload["messages"])
+    if "tools" in payload:
+        prompt_chars += len(orjson.dumps(payload["tools"]))
+    return prompt_chars // 4 + payload["max_tokens"]
+
+
+# Name of the single tool Groq is forced to call for structured output
+_STRUCTURED_TOOL = "emit"
+
+# Below this size a parse takes microseconds, less than a thread hand-off
+_OFFLOAD_PARSE_CHARS = 10 * 1024
+
+
+async def _parse_structured(response: str) -> Dict[str, Any]:
+    """Parse a structured LLM response; large ones are parsed off the event loop"""
+    try:
+        if len(response) > _OFFLOAD_PARSE_CHARS:
+            return await asyncio.to_thread(orjson.loads, response)
+        return orjson.loads(response)
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response: {response}")
+        raise ValueError(f"Invalid JSON response from LLM: {e}")
+
+
 class LLMClient(ABC):
     """Abstract base class for LLM clients"""
     
+    _http: httpx.AsyncClient
+    _semaphore: asyncio.Semaphore  # Caps in-flight requests to the LLM backend
+    
+    async def aclose(self):
+        """Close the underlying HTTP connection pool"""
+        await self._http.aclose()
+    
     @abstractmethod
     async def generate(
         self,
@@ -30,6 +105,17 @@ class LLMClient(ABC):
         """Generate completion from LLM"""
         pass
     
+    @abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """Stream completion tokens from LLM as they are generated"""
+        pass
+    
     @abstractmethod
     async def generate_structured(
         self,
@@ -48,6 +134,8 @@ class OllamaClient(LLMClient):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model_extraction = settings.OLLAMA_MODEL_EXTRACTION
         self.model_validation = settings.OLLAMA_MODEL_VALIDATION
+        self._http = _create_http_client(http2=False)  # Local Ollama speaks HTTP/1.1
+        self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
         logger.info(f"Initialized Ollama client: {self.base_url}")
     
     async def generate(
@@ -60,34 +148,87 @@ class OllamaClient(LLMClient):
         model: Optional[str] = None
     ) -> str:
         """Generate completion from Ollama"""
-        async with httpx.AsyncClient(timeout=settings.LLM_TIMEOUT) as client:
-            payload = {
-                "model": model or self.model_extraction,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
-            }
-            
-            if system_prompt:
-                payload["system"] = system_prompt
-            
-            if json_mode:
-                payload["format"] = "json"
-            
-            try:
-                response = await client.post(
+        payload = self._build_payload(
+            prompt, system_prompt, temperature, max_tokens, model, stream=False
+        )
+        
+        if json_mode:
+            payload["format"] = "json"
+        
+        return await self._post_generate(payload)
+    
+    async def _post_generate(self, payload: Dict[str, Any]) -> str:
+        """POST a non-streaming /api/generate request and return the completion text"""
+        try:
+            async with self._semaphore:
+                response = await self._http.post(
                     f"{self.base_url}/api/generate",
-                    json=payload
+                    content=orjson.dumps(payload)
                 )
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+            return result.get("response", "")
+        except Exception as e:
+            logger.error(f"Ollama generation error: {e}")
+            raise
+    
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 500,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream completion tokens from Ollama (newline-delimited JSON)"""
+        payload = self._build_payload(
+            prompt, system_prompt, temperature, max_tokens, model, stream=True
+        )
+        
+        try:
+            async with self._semaphore, self._http.stream(
+                "POST",
+                f"{self.base_url}/api/generate",
+                content=orjson.dumps(payload)
+            ) as response:
                 response.raise_for_status()
-                result = response.json()
-                return result.get("response", "")
-            except Exception as e:
-                logger.error(f"Ollama generation error: {e}")
-                raise
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    token = chunk.get("response")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama streaming error: {e}")
+            raise
+    
+    def _build_payload(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Build the /api/generate request body"""
+        payload = {
+            "model": model or self.model_extraction,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        
+        if system_prompt:
+            payload["system"] = system_prompt
+        
+        return payload
     
     async def generate_structured(
         self,
@@ -97,24 +238,22 @@ class OllamaClient(LLMClient):
         model: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate structured JSON output from Ollama"""
-        # Add JSON instruction to prompt
-        full_prompt = f"{prompt}\n\nRespond with valid JSON only."
+        if schema and settings.OLLAMA_STRUCTURED_OUTPUTS:
+            # The schema constrains decoding server-side instead of riding in the prompt
+            payload = self._build_payload(
+                prompt, system_prompt, settings.LLM_TEMPERATURE, settings.LLM_MAX_TOKENS, model, stream=False
+            )
+            payload["format"] = schema
+            response = await self._post_generate(payload)
+        else:
+            response = await self.generate(
+                prompt=prompt,
+                system_prompt=_with_schema(system_prompt, schema),
+                json_mode=True,
+                model=model
+            )
         
-        if schema:
-            full_prompt += f"\n\nJSON Schema:\n{json.dumps(schema, indent=2)}"
-        
-        response = await self.generate(
-            prompt=full_prompt,
-            system_prompt=system_prompt,
-            json_mode=True,
-            model=model
-        )
-        
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {response}")
-            raise ValueError(f"Invalid JSON response from LLM: {e}")
+        return await _parse_structured(response)
 
 
 class GroqClient(LLMClient):
@@ -126,6 +265,13 @@ class GroqClient(LLMClient):
         self.api_key = settings.GROQ_API_KEY
         self.model = settings.GROQ_MODEL
         self.base_url = "https://api.groq.com/openai/v1"
+        self._http = _create_http_client(http2=True)
+        self._http.headers["Authorization"] = f"Bearer {self.api_key}"  # Sent with every request
+        self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._limiter = AsyncRateLimiter(
+            settings.GROQ_REQUESTS_PER_MINUTE,
+            settings.GROQ_TOKENS_PER_MINUTE
+        )
         logger.info(f"Initialized Groq client with model: {self.model}")
     
     async def generate(
@@ -137,34 +283,111 @@ class GroqClient(LLMClient):
         json_mode: bool = False
     ) -> str:
         """Generate completion from Groq"""
-        async with httpx.AsyncClient(timeout=settings.LLM_TIMEOUT) as client:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
-            
-            if json_mode:
-                payload["response_format"] = {"type": "json_object"}
-            
-            try:
-                response = await client.post(
+        payload = self._build_payload(
+            prompt, system_prompt, temperature, max_tokens, stream=False
+        )
+        
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        
+        try:
+            response = await self._post_with_retry(payload)
+            result = orjson.loads(response.content)
+            return result["choices"][0]["message"]["content"]
+        except Exception as e:
+            logger.error(f"Groq generation error: {e}")
+            raise
+    
+    async def _post_with_retry(self, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        POST a completion, retrying rate-limit (429) and overload (503)
+        responses with jittered exponential backoff. The wait happens
+        outside the semaphore so other requests can use the slot.
+        """
+        body = orjson.dumps(payload)
+        est_tokens = _estimate_tokens(payload)
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            await self._limiter.acquire(est_tokens)
+            async with self._semaphore:
+                response = await self._http.post(
                     f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers={"Authorization": f"Bearer {self.api_key}"}
+                    content=body
                 )
+            self._limiter.update_from_headers(response.headers)
+            if response.status_code not in (429, 503) or attempt == settings.LLM_MAX_RETRIES:
+                break
+            
+            retry_after = response.headers.get("retry-after")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = random.uniform(0, 2 ** attempt)
+            logger.warning(f"Groq returned {response.status_code}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        
+        response.raise_for_status()
+        return response
+    
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """Stream completion tokens from Groq (server-sent events)"""
+        payload = self._build_payload(
+            prompt, system_prompt, temperature, max_tokens, stream=True
+        )
+        
+        try:
+            await self._limiter.acquire(_estimate_tokens(payload))
+            async with self._semaphore, self._http.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                content=orjson.dumps(payload)
+            ) as response:
+                self._limiter.update_from_headers(response.headers)
                 response.raise_for_status()
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            except Exception as e:
-                logger.error(f"Groq generation error: {e}")
-                raise
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+                    chunk = orjson.loads(data)
+                    token = chunk["choices"][0]["delta"].get("content")
+                    if token:
+                        yield token
+        except Exception as e:
+            logger.error(f"Groq streaming error: {e}")
+            raise
+    
+    def _build_payload(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Build the /chat/completions request body"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        
+        if stream:
+            payload["stream"] = True
+        
+        return payload
     
     async def generate_structured(
         self,
@@ -172,31 +395,56 @@ class GroqClient(LLMClient):
         system_prompt: Optional[str] = None,
         schema: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Generate structured JSON output from Groq"""
-        full_prompt = f"{prompt}\n\nRespond with valid JSON only."
-        if schema:
-            full_prompt += f"\n\nJSON Schema:\n{json.dumps(schema, indent=2)}"
-        
-        response = await self.generate(
-            prompt=full_prompt,
-            system_prompt=system_prompt,
-            json_mode=True
+        """
+        Generate structured JSON output from Groq. With a schema, the model
+        is forced to call a single tool whose parameters are the schema, so
+        the schema travels as a tool definition rather than prompt text.
+        """
+        payload = self._build_payload(
+            prompt, system_prompt, settings.LLM_TEMPERATURE, settings.LLM_MAX_TOKENS, stream=False
         )
         
+        if schema:
+            payload["tools"] = [{
+                "type": "function",
+                "function": {
+                    "name": _STRUCTURED_TOOL,
+                    "description": "Return the result in the required structure",
+                    "parameters": schema
+                }
+            }]
+            payload["tool_choice"] = {"type": "function", "function": {"name": _STRUCTURED_TOOL}}
+        else:
+            payload["response_format"] = {"type": "json_object"}
+        
         try:
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {response}")
-            raise ValueError(f"Invalid JSON response from LLM: {e}")
+            response = await self._post_with_retry(payload)
+            message = orjson.loads(response.content)["choices"][0]["message"]
+        except Exception as e:
+            logger.error(f"Groq generation error: {e}")
+            raise
+        
+        if schema:
+            tool_calls = message.get("tool_calls")
+            if not tool_calls:
+                logger.error(f"Groq returned no tool call: {message.get('content')}")
+                raise ValueError("Invalid response from LLM: no tool call returned")
+            response = tool_calls[0]["function"]["arguments"]
+        else:
+            response = message["content"]
+        
+        return await _parse_structured(response)
 
 
 # ============================================
 # Client Factory
 # ============================================
 
+@lru_cache(maxsize=1)
 def get_llm_client() -> LLMClient:
     """
     Factory function to get the appropriate LLM client based on configuration.
+    The client (and its connection pool) is created once and reused.
     """
     provider = settings.LLM_PROVIDER.lower()
     
@@ -0,0 +1,165 @@
+# CHECKPOINT_5_LLM_PIPELINE
+"""
+Rule-Based Fast Path
+====================
+Parses obvious expenses ("uber 15", "$4.50 coffee") locally, so they skip
+the LLM entirely. Anything ambiguous returns None and goes to the LLM.
+"""
+
+import re
+from typing import Any, Dict, Optional, Set
+from backend.llm.prompts import today_str
+
+# ============================================
+# Keyword Map
+# ============================================
+
+KEYWORD_MAP: Dict[str, str] = {
+    # food
+    "groceries": "food", "grocery": "food", "supermarket": "food", "coffee": "food",
+    "starbucks": "food", "lunch": "food", "dinner": "food", "breakfast": "food",
+    "brunch": "food", "restaurant": "food", "pizza": "food", "burger": "food",
+    "sushi": "food", "snacks": "food", "snack": "food", "takeout": "food",
+    "doordash": "food", "ubereats": "food", "grubhub": "food", "bakery": "food",
+    # transportation
+    "uber": "transportation", "lyft": "transportation", "taxi": "transportation",
+    "cab": "transportation", "gas": "transportation", "fuel": "transportation",
+    "parking": "transportation", "bus": "transportation", "train": "transportation",
+    "subway": "transportation", "metro": "transportation", "toll": "transportation",
+    # entertainment
+    "movie": "entertainment", "movies": "entertainment", "cinema": "entertainment",
+    "concert": "entertainment", "netflix": "entertainment", "spotify": "entertainment",
+    "hulu": "entertainment", "theater": "entertainment", "bowling": "entertainment",
+    # utilities
+    "electricity": "utilities", "electric": "utilities", "water bill": "utilities",
+    "internet": "utilities", "wifi": "utilities", "phone bill": "utilities",
+    "gas bill": "utilities",
+    # housing
+    "rent": "housing", "mortgage": "housing", "furniture": "housing",
+    # healthcare
+    "doctor": "healthcare", "pharmacy": "healthcare", "medicine": "healthcare",
+    "dentist": "healthcare", "prescription": "healthcare", "copay": "healthcare",
+    # shopping
+    "clothes": "shopping", "shoes": "shopping", "amazon": "shopping",
+    "electronics": "shopping", "target": "shopping", "walmart": "shopping",
+    # education
+    "textbook": "education", "textbooks": "education", "tuition": "education",
+    "course": "education", "books": "education",
+    # personal
+    "haircut": "personal", "gym": "personal", "salon": "personal", "gift": "personal",
+}
+
+# Longest keywords first so "water bill" wins over shorter overlaps
+_KEYWORDS = re.compile(
+    r"\b(" + "|".join(re.escape(k) for k in sorted(KEYWORD_MAP, key=len, reverse=True)) + r")\b"
+)
+
+_AMOUNT = re.compile(r"(?<![\w.])\$?(\d+(?:\.\d{1,2})?)(?![\w.])")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Anything that implies a date other than today, another intent, or a
+# non-dollar currency needs the LLM
+_NEEDS_LLM = re.compile(
+    r"\b(yesterday|tomorrow|ago|last|next|week|month|year|monday|tuesday|wednesday|"
+    r"thursday|friday|saturday|sunday|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|"
+    r"nov|dec|daily|weekly|monthly|yearly|budget|how|what|total|split|each|per)\b|[?€£¥₹]"
+)
+
+# Money coming in, money that never went out, or a negated purchase: the
+# keyword's category says nothing about whether this is an expense
+_NOT_AN_EXPENSE = re.compile(
+    r"\b(earn\w*|income|salary|sold|sell\w*|refund\w*|reimburs\w*|lent|lend\w*|loan\w*|"
+    r"borrow\w*|owe\w*|received?|return\w*|cancel\w*|got paid|paid (?:by|me|back)|"
+    r"not|no|never|didn'?t|don'?t|doesn'?t|won'?t|wasn'?t|without)\b"
+)
+
+_CURRENCY_WORD = re.compile(r" (dollars?|bucks?|usd)\b")
+
+# Spoken amounts ("five dollars") as well as digits
+_SPOKEN_AMOUNT = re.compile(
+    r"\d|\b(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|fifteen|"
+    r"twenty|thirty|forty|fifty|hundred|thousand|dollars?|bucks?|cents?)\b"
+)
+
+_DATE = re.compile(
+    r"\b(today|yesterday|tomorrow|tonight|ago|last|monday|tuesday|wednesday|thursday|"
+    r"friday|saturday|sunday|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\b"
+    r"|\d{1,2}/\d{1,2}"
+)
+
+_FILLER = re.compile(
+    r"\b(i|spent|paid|pay|bought|got|was|it|cost|dollars?|bucks?|usd|on|for|today)\b|\$"
+)
+
+
+def mentioned_details(text: str) -> Set[str]:
+    """Which of "amount", "category" and "date" a piece of text mentions at all"""
+    text = text.lower()
+    found = set()
+    if _SPOKEN_AMOUNT.search(text):
+        found.add("amount")
+    if _KEYWORDS.search(text):
+        found.add("category")
+    if _DATE.search(text):
+        found.add("date")
+    return found
+
+
+def fast_parse(user_input: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse an obvious expense without the LLM.
+
+    Returns:
+        A result shaped like the combined extract-and-validate LLM output
+        ({"extracted": ..., "validated": ...}), or None if the input needs the LLM
+    """
+    text = " ".join(user_input.lower().replace("\u2019", "'").split())
+    if not text or _NEEDS_LLM.search(text) or _NOT_AN_EXPENSE.search(text):
+        return None
+
+    # Exactly one number, and it must be a plain amount
+    if len(_NUMBER.findall(text)) != 1:
+        return None
+    amounts = list(_AMOUNT.finditer(text))
+    if len(amounts) != 1 or float(amounts[0].group(1)) <= 0:
+        return None
+    amount = amounts[0]
+
+    # Exactly one category among the matched keywords
+    keywords = list(_KEYWORDS.finditer(text))
+    categories = {KEYWORD_MAP[k.group(1)] for k in keywords}
+    if len(categories) != 1:
+        return None
+
+    # The number must read as money: "$15", "15 dollars", or right next to
+    # the keyword ("uber 15", "15 uber"); "lunch with 3 friends" is a count
+    if not (
+        amount.group(0).startswith("$")
+        or _CURRENCY_WORD.match(text, amount.end())
+        or any(k.end() + 1 == amount.start() or amount.end() + 1 == k.start() for k in keywords)
+    ):
+        return None
+
+    description = " ".join(_FILLER.sub(" ", _AMOUNT.sub(" ", text)).split())
+    if not description:
+        return None
+    description = description[0].upper() + description[1:]
+
+    data = {
+        "amount": float(amount.group(1)),
+        "category": categories.pop(),
+        "description": description,
+        "date": today_str()
+    }
+    return {
+        "extracted": {
+            "intent": "add_expense",
+            "extracted_data": {**data, "confidence": 1.0}
+        },
+        "validated": {
+            "is_valid": True,
+            "validated_data": data,
+            "errors": [],
+            "suggestions": {}
+        }
+    }
@@ -7,15 +7,95 @@ Implements the dual-LLM architecture:
 - LLM #2: Validate and normalize the extracted data
 """
 
-from typing import Dict, Any, Optional, Tuple
+import asyncio
+import copy
+import re
+import fastjsonschema
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-from backend.llm.client import get_llm_client
-from backend.llm.prompts import build_extraction_prompt, build_validation_prompt
-from backend.llm.schemas import EXPENSE_EXTRACTION_SCHEMA, EXPENSE_VALIDATION_SCHEMA
+from functools import cached_property, lru_cache
+from backend.config import settings
+from backend.llm import cache as llm_cache
+from backend.llm.client import LLMClient, get_llm_client
+from backend.llm.fast_categorize import fast_parse
+from backend.llm.prompts import (
+    PROMPT_VERSION,
+    today_str,
+    build_extraction_prompt,
+    build_validation_prompt,
+    build_extract_and_validate_prompt
+)
+from backend.llm.schemas import (
+    ADD_EXPENSE_SCHEMA,
+    EXPENSE_EXTRACTION_SCHEMA,
+    EXPENSE_VALIDATION_SCHEMA,
+    EXPENSE_EXTRACT_AND_VALIDATE_SCHEMA
+)
 from backend.utils.logger import get_logger
 
 logger = get_logger("llm_pipeline")
 
+_EXPENSE_FIELDS = ADD_EXPENSE_SCHEMA["parameters"]["properties"]
+_EXPENSE_CATEGORIES = frozenset(_EXPENSE_FIELDS["category"]["enum"])
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Compiled once; checking a response is then a plain function call
+_check_extraction = fastjsonschema.compile(EXPENSE_EXTRACTION_SCHEMA)
+_check_validated_data = fastjsonschema.compile(
+    EXPENSE_VALIDATION_SCHEMA["properties"]["validated_data"]
+)
+
+
+def _enforce_validated_data(validated: Dict[str, Any]):
+    """
+    Reject a validation result that claims to be valid but whose
+    validated_data doesn't match the schema (it would be saved as-is).
+    """
+    if not validated.get("is_valid", False):
+        return
+    try:
+        _check_validated_data(validated.get("validated_data"))
+    except fastjsonschema.JsonSchemaValueException as e:
+        logger.warning(f"LLM returned malformed validated_data: {e.message}")
+        validated["is_valid"] = False
+        validated["errors"] = list(validated.get("errors") or []) + [
+            f"Validated data did not match the schema: {e.message}"
+        ]
+
+
+def _validate_locally(extracted_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Validate a confident, well-formed extraction without an LLM call.
+    Returns a result shaped like the validation LLM's, or None if the
+    extraction needs the LLM to clean it up.
+    """
+    data = extracted_data.get("extracted_data") or {}
+    amount = data.get("amount")
+    description = data.get("description")
+    date = data.get("date")
+    
+    if not (
+        extracted_data.get("intent") == "add_expense"
+        and (data.get("confidence") or 0) >= settings.EXTRACTION_CONFIDENCE_SKIP_THRESHOLD
+        and isinstance(amount, (int, float)) and not isinstance(amount, bool) and amount > 0
+        and data.get("category") in _EXPENSE_CATEGORIES
+        and isinstance(description, str) and 0 < len(description.strip()) <= _EXPENSE_FIELDS["description"]["maxLength"]
+        and isinstance(date, str) and _ISO_DATE.fullmatch(date)
+    ):
+        return None
+    
+    return {
+        "is_valid": True,
+        "validated_data": {
+            "amount": float(amount),
+            "category": data["category"],
+            "description": description.strip(),
+            "date": date
+        },
+        "errors": [],
+        "suggestions": {}
+    }
+
 
 class TwoLLMPipeline:
     """
@@ -25,13 +105,19 @@ class TwoLLMPipeline:
     """
     
     def __init__(self):
-        self.llm_client = get_llm_client()
+        self._inflight: Dict[str, asyncio.Task] = {}  # One LLM call per distinct input at a time
         logger.info("Initialized Two-LLM Pipeline")
     
+    @cached_property
+    def llm_client(self) -> LLMClient:
+        """The shared LLM client, resolved on first use"""
+        return get_llm_client()
+    
     async def extract_expense_data(
         self,
         user_input: str,
-        input_method: str = "text"
+        input_method: str = "text",
+        timestamp: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Stage 1: Extract expense information from user input using LLM #1
@@ -39,6 +125,7 @@ class TwoLLMPipeline:
         Args:
             user_input: Raw text input from user
             input_method: 'text' or 'voice'
+            timestamp: ISO time to stamp the metadata with (default: now)
         
         Returns:
             Extracted data with confidence scores
@@ -55,6 +142,7 @@ class TwoLLMPipeline:
                 system_prompt=prompts["system"],
                 schema=EXPENSE_EXTRACTION_SCHEMA
             )
+            _check_extraction(extracted)
             
             logger.info(f"Stage 1 - Extracted: {extracted}")
             
@@ -62,7 +150,7 @@ class TwoLLMPipeline:
             extracted["metadata"] = {
                 "input_method": input_method,
                 "original_input": user_input,
-                "extracted_at": datetime.now().isoformat(),
+                "extracted_at": timestamp or datetime.now().isoformat(),
                 "stage": "extraction"
             }
             
@@ -75,7 +163,8 @@ class TwoLLMPipeline:
     async def validate_expense_data(
         self,
         extracted_data: Dict[str, Any],
-        original_input: str
+        original_input: str,
+        timestamp: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Stage 2: Validate and normalize extracted data using LLM #2
@@ -83,6 +172,7 @@ class TwoLLMPipeline:
         Args:
             extracted_data: Data from extraction stage
             original_input: Original user input for context
+            timestamp: ISO time to stamp the metadata with (default: now)
         
         Returns:
             Validated and normalized expense data
@@ -90,24 +180,31 @@ class TwoLLMPipeline:
         logger.info("Stage 2 - Validating and normalizing extracted data...")
         
         try:
-            # Build validation prompts
-            prompts = build_validation_prompt(
-                extracted_data.get("extracted_data", {}),
-                original_input
-            )
-            
-            # Call LLM #2 for validation
-            validated = await self.llm_client.generate_structured(
-                prompt=prompts["user"],
-                system_prompt=prompts["system"],
-                schema=EXPENSE_VALIDATION_SCHEMA
-            )
+            # Clean, confident extractions don't need a second LLM round trip
+            validated = _validate_locally(extracted_data)
             
-            logger.info(f"Stage 2 - Validated: {validated}")
+            if validated is None:
+                # Build validation prompts
+                prompts = build_validation_prompt(
+                    extracted_data.get("extracted_data", {}),
+                    original_input
+                )
+                
+                # Call LLM #2 for validation
+                validated = await self.llm_client.generate_structured(
+                    prompt=prompts["user"],
+                    system_prompt=prompts["system"],
+                    schema=EXPENSE_VALIDATION_SCHEMA
+                )
+                _enforce_validated_data(validated)
+                
+                logger.info(f"Stage 2 - Validated: {validated}")
+            else:
+                logger.info("Stage 2 - Validated locally (confident extraction)")
             
             # Enrich with metadata
             validated["metadata"] = {
-                "validated_at": datetime.now().isoformat(),
+                "validated_at": timestamp or datetime.now().isoformat(),
                 "stage": "validation",
                 "extraction_confidence": extracted_data.get("extracted_data", {}).get("confidence", 0)
             }
@@ -118,6 +215,111 @@ class TwoLLMPipeline:
             logger.error(f"Stage 2 - Validation failed: {e}")
             raise ValueError(f"Failed to validate expense data: {e}")
     
+    async def extract_and_validate(
+        self,
+        user_input: str,
+        input_method: str = "text",
+        timestamp: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Both stages in a single LLM call (one round trip instead of two)
+        
+        Args:
+            user_input: Raw text input from user
+            input_method: 'text' or 'voice'
+            timestamp: ISO time to stamp the metadata with (default: now)
+        
+        Returns:
+            Tuple of (extracted, validated), shaped like the outputs of
+            extract_expense_data and validate_expense_data
+        """
+        logger.info(f"Extracting and validating input: {user_input[:50]}...")
+        
+        try:
+            # Obvious inputs ("uber 15") are parsed by keyword rules, skipping the LLM
+            result = fast_parse(user_input) if settings.LLM_FAST_PATH else None
+            if result is not None:
+                logger.info("Parsed by keyword rules")
+            else:
+                cache_key = self._cache_key(user_input)
+                result = await llm_cache.get(cache_key)
+                if result is not None:
+                    logger.info("Using cached LLM result")
+                else:
+                    # Concurrent identical inputs share a single LLM call
+                    task = self._inflight.get(cache_key)
+                    if task is None:
+                        task = asyncio.create_task(
+                            self._generate_extract_and_validate(user_input, cache_key)
+                        )
+                        self._inflight[cache_key] = task
+                        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+                    
+                    # Shielded so one caller being cancelled doesn't cancel the others;
+                    # each caller gets its own copy to attach metadata to
+                    result = copy.deepcopy(await asyncio.shield(task))
+            
+            extracted = result["extracted"]
+            validated = result["validated"]
+            logger.info(f"Extracted: {extracted}; Validated: {validated}")
+            
+            # Enrich with the same metadata as the two-call path
+            now = timestamp or datetime.now().isoformat()
+            extracted["metadata"] = {
+                "input_method": input_method,
+                "original_input": user_input,
+                "extracted_at": now,
+                "stage": "extraction"
+            }
+            validated["metadata"] = {
+                "validated_at": now,
+                "stage": "validation",
+                "extraction_confidence": extracted.get("extracted_data", {}).get("confidence", 0)
+            }
+            
+            return extracted, validated
+            
+        except Exception as e:
+            logger.error(f"Extract and validate failed: {e}")
+            raise ValueError(f"Failed to process expense data: {e}")
+    
+    def _cache_key(self, user_input: str) -> str:
+        """Result-cache key for an input"""
+        # Relative dates ("yesterday") depend on today, so it is part of the key;
+        # so is the model, since the cache may be shared across deployments
+        model = getattr(self.llm_client, "model", None) or getattr(self.llm_client, "model_extraction", "")
+        return llm_cache.make_key(
+            PROMPT_VERSION, settings.LLM_PROVIDER, model, today_str(), " ".join(user_input.split())
+        )
+    
+    async def _generate_extract_and_validate(
+        self,
+        user_input: str,
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """Run the combined LLM call and cache the result if it validated"""
+        if settings.LLM_UNIFIED_PIPELINE:
+            prompts = build_extract_and_validate_prompt(user_input)
+            
+            result = await self.llm_client.generate_structured(
+                prompt=prompts["user"],
+                system_prompt=prompts["system"],
+                schema=EXPENSE_EXTRACT_AND_VALIDATE_SCHEMA
+            )
+            _enforce_validated_data(result["validated"])
+        else:
+            # Two-stage baseline, kept for comparison
+            now = datetime.now().isoformat()
+            extracted = await self.extract_expense_data(user_input, timestamp=now)
+            validated = await self.validate_expense_data(extracted, user_input, timestamp=now)
+            result = {"extracted": extracted, "validated": validated}
+        
+        # Only successful validations are reused
+        if result["validated"].get("is_valid", False):
+            await llm_cache.put(cache_key, result)
+        
+        return result
+    
     async def process_expense_input(
         self,
         user_input: str,
@@ -135,9 +337,12 @@ class TwoLLMPipeline:
         """
         logger.info(f"Processing expense input via {input_method}: {user_input[:50]}...")
         
+        # One timestamp for all of this input's metadata
+        now = datetime.now().isoformat()
+        
         try:
-            # Stage 1: Extraction
-            extracted = await self.extract_expense_data(user_input, input_method)
+            # Both stages in one LLM call
+            extracted, validated = await self.extract_and_validate(user_input, input_method, timestamp=now)
             
             # Check if extraction found valid intent
             intent = extracted.get("intent", "unknown")
@@ -147,9 +352,6 @@ class TwoLLMPipeline:
             if intent != "add_expense":
                 return False, None, f"This pipeline only handles expenses, got intent: {intent}"
             
-            # Stage 2: Validation
-            validated = await self.validate_expense_data(extracted, user_input)
-            
             # Check validation result
             if not validated.get("is_valid", False):
                 errors = validated.get("errors", ["Unknown validation error"])
@@ -164,7 +366,7 @@ class TwoLLMPipeline:
                 "validated_data": validated.get("validated_data", {}),
                 "suggestions": validated.get("suggestions", {}),
                 "confidence": extracted.get("extracted_data", {}).get("confidence", 0),
-                "processed_at": datetime.now().isoformat()
+                "processed_at": now
             }
             
             logger.info("✓ Pipeline completed successfully")
@@ -174,6 +376,37 @@ class TwoLLMPipeline:
             logger.error(f"Pipeline error: {e}", exc_info=True)
             return False, None, str(e)
 
+    
+    async def process_expense_batch(
+        self,
+        inputs: List[str],
+        input_method: str = "text"
+    ) -> List[Tuple[bool, Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Run the pipeline over several inputs concurrently.
+        The LLM client's semaphore bounds how many calls are in flight.
+        
+        Returns:
+            One (success, validated_data, error_message) tuple per input, in order
+        """
+        return await asyncio.gather(
+            *(self.process_expense_input(text, input_method) for text in inputs)
+        )
+
+
+# ============================================
+# Pipeline Factory
+# ============================================
+
+@lru_cache(maxsize=1)
+def get_pipeline() -> TwoLLMPipeline:
+    """
+    Get the shared pipeline instance.
+    The pipeline holds no per-request state, so one instance (and its
+    pooled LLM client) serves every request.
+    """
+    return TwoLLMPipeline()
+
 
 # ============================================
 # Convenience Functions
@@ -181,11 +414,9 @@ class TwoLLMPipeline:
 
 async def process_text_expense(text: str) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
     """Process text expense input through the pipeline"""
-    pipeline = TwoLLMPipeline()
-    return await pipeline.process_expense_input(text, "text")
+    return await get_pipeline().process_expense_input(text, "text")
 
 
 async def process_voice_expense(text: str) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
     """Process voice expense input (already transcribed) through the pipeline"""
-    pipeline = TwoLLMPipeline()
-    return await pipeline.process_expense_input(text, "voice")
+    return await get_pipeline().process_expense_input(text, "voice")
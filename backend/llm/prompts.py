@@ -6,7 +6,13 @@ Prompt templates for the two-LLM pipeline and function calling.
 """
 
 from typing import Dict, Any
-from datetime import datetime
+from datetime import date
+
+# Bump whenever a prompt or schema changes so cached LLM results are not reused
+PROMPT_VERSION = "2"
+
+# Provider-side prompt caches match on identical prefixes, so every template
+# keeps its static instructions first and the per-request fields last
 
 # ============================================
 # LLM #1: Extraction Prompts
@@ -30,15 +36,15 @@ Examples:
 Always respond with valid JSON matching the schema provided.
 """
 
-EXTRACTION_USER_PROMPT_TEMPLATE = """Extract expense information from this input:
+EXTRACTION_USER_PROMPT_TEMPLATE = """Extract expense information from the input below.
 
-User input: "{user_input}"
+Extract: amount, category, description, and date. If any information is missing or unclear, make your best guess based on context and set confidence accordingly.
 
-Today's date: {today_date}
+Respond with valid JSON only.
 
-Extract: amount, category, description, and date. If any information is missing or unclear, make your best guess based on context and set confidence accordingly.
+Today's date: {today_date}
 
-Respond with valid JSON only."""
+User input: "{user_input}\""""
 
 
 # ============================================
@@ -61,7 +67,17 @@ If data is invalid, explain why. If valid, provide the cleaned version.
 Always respond with valid JSON matching the schema provided.
 """
 
-VALIDATION_USER_PROMPT_TEMPLATE = """Validate and clean this extracted expense data:
+VALIDATION_USER_PROMPT_TEMPLATE = """Validate and clean the extracted expense data below.
+
+Check if:
+1. Amount is a positive number and reasonable (not too large or small)
+2. Category matches one of the standard categories
+3. Description is clear and concise
+4. Date is in valid ISO format (YYYY-MM-DD)
+
+If valid, return cleaned data. If invalid, list errors and provide suggestions.
+
+Respond with valid JSON only.
 
 Extracted data:
 - Amount: {amount}
@@ -69,17 +85,46 @@ Extracted data:
 - Description: {description}
 - Date: {date}
 
-Original input: "{original_input}"
+Original input: "{original_input}\""""
 
-Check if:
-1. Amount is a positive number and reasonable (not too large or small)
-2. Category matches one of the standard categories
-3. Description is clear and concise
-4. Date is in valid ISO format (YYYY-MM-DD)
 
-If valid, return cleaned data. If invalid, list errors and provide suggestions.
+# ============================================
+# Combined Extraction + Validation Prompts
+# ============================================
+# Both stages in one completion, so the hot path pays a single LLM round trip
 
-Respond with valid JSON only."""
+EXTRACT_AND_VALIDATE_SYSTEM_PROMPT = """You are an expense tracking assistant that extracts and then validates expense information in one step.
+
+Step 1 - Extract from the user input:
+1. Amount: The monetary value (convert words to numbers if needed)
+2. Category: Classify into one of: food, transportation, entertainment, utilities, housing, healthcare, shopping, education, personal, other
+3. Description: A brief summary of what the expense was for
+4. Date: The date of the expense (default to today if not specified)
+
+User input can be text or transcribed speech. Handle colloquialisms and informal language.
+
+Step 2 - Validate what you extracted:
+1. Verify that the data is accurate and reasonable
+2. Normalize the category to one of the standard values
+3. Clean and improve the description
+4. Make sure the date is in ISO format (YYYY-MM-DD)
+5. Check that the amount is a positive, realistic number
+
+Return the raw extraction under "extracted" and the validation result under "validated".
+If the data is invalid, explain why in "validated.errors".
+
+Always respond with valid JSON matching the schema provided.
+"""
+
+EXTRACT_AND_VALIDATE_USER_PROMPT_TEMPLATE = """Extract and validate expense information from the input below.
+
+If any information is missing or unclear, make your best guess based on context and set confidence accordingly. If the validated data is valid, return the cleaned data; otherwise list errors and provide suggestions.
+
+Respond with valid JSON only.
+
+Today's date: {today_date}
+
+User input: "{user_input}\""""
 
 
 # ============================================
@@ -130,14 +175,24 @@ Category:"""
 # Prompt Builders
 # ============================================
 
+_today_cache = {"date": None, "str": ""}
+
+
+def today_str() -> str:
+    """Today's date as YYYY-MM-DD, formatted once per day"""
+    d = date.today()
+    if _today_cache["date"] != d:
+        _today_cache.update(date=d, str=d.isoformat())
+    return _today_cache["str"]
+
+
 def build_extraction_prompt(user_input: str) -> Dict[str, str]:
     """Build prompt for extraction LLM"""
-    today = datetime.now().strftime("%Y-%m-%d")
     return {
         "system": EXTRACTION_SYSTEM_PROMPT,
         "user": EXTRACTION_USER_PROMPT_TEMPLATE.format(
             user_input=user_input,
-            today_date=today
+            today_date=today_str()
         )
     }
 
@@ -159,14 +214,24 @@ def build_validation_prompt(
     }
 
 
+def build_extract_and_validate_prompt(user_input: str) -> Dict[str, str]:
+    """Build prompt for the combined extraction + validation call"""
+    return {
+        "system": EXTRACT_AND_VALIDATE_SYSTEM_PROMPT,
+        "user": EXTRACT_AND_VALIDATE_USER_PROMPT_TEMPLATE.format(
+            user_input=user_input,
+            today_date=today_str()
+        )
+    }
+
+
 def build_function_calling_prompt(user_input: str) -> Dict[str, str]:
     """Build prompt for function calling"""
-    today = datetime.now().strftime("%Y-%m-%d")
     return {
         "system": FUNCTION_CALLING_SYSTEM_PROMPT,
         "user": FUNCTION_CALLING_USER_PROMPT_TEMPLATE.format(
             user_input=user_input,
-            today_date=today
+            today_date=today_str()
         )
     }
 
@@ -198,6 +198,19 @@ EXPENSE_VALIDATION_SCHEMA = {
     "required": ["is_valid", "validated_data", "errors"]
 }
 
+# ============================================
+# Combined Extraction + Validation Schema
+# ============================================
+
+EXPENSE_EXTRACT_AND_VALIDATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "extracted": EXPENSE_EXTRACTION_SCHEMA,
+        "validated": EXPENSE_VALIDATION_SCHEMA
+    },
+    "required": ["extracted", "validated"]
+}
+
 # ============================================
 # Schema Registry
 # ============================================
@@ -206,10 +219,31 @@ SCHEMAS: Dict[str, Dict[str, Any]] = {
     "add_expense": ADD_EXPENSE_SCHEMA,
     "set_budget": SET_BUDGET_SCHEMA,
     "extraction": EXPENSE_EXTRACTION_SCHEMA,
-    "validation": EXPENSE_VALIDATION_SCHEMA
+    "validation": EXPENSE_VALIDATION_SCHEMA,
+    "extract_and_validate": EXPENSE_EXTRACT_AND_VALIDATE_SCHEMA
 }
 
 
+def compact_schema(schema: Any) -> Any:
+    """
+    Copy of a schema without "description" annotations, for inlining into
+    prompts. Property names (including one called "description") are kept.
+    """
+    if isinstance(schema, list):
+        return [compact_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    return {
+        key: (
+            {name: compact_schema(prop) for name, prop in value.items()}
+            if key == "properties"
+            else compact_schema(value)
+        )
+        for key, value in schema.items()
+        if key != "description"
+    }
+
+
 def get_schema(name: str) -> Dict[str, Any]:
     """Get a schema by name"""
     if name not in SCHEMAS:
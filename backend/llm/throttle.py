@@ -0,0 +1,110 @@
+# CHECKPOINT_5_LLM_PIPELINE
+"""
+LLM Rate Limiter
+================
+Client-side token bucket for hosted LLM providers, so bursts wait for
+quota up front instead of running into 429s and retry sleeps.
+"""
+
+import asyncio
+import math
+import re
+import time
+from typing import Mapping, Optional
+from backend.utils.logger import get_logger
+
+logger = get_logger("llm_throttle")
+
+# Provider reset durations look like "2m59.56s", "7.66s" or "500ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_duration(value: Optional[str]) -> float:
+    """Parse a provider reset duration into seconds (0 if missing)"""
+    if not value:
+        return 0.0
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in _DURATION_PART.findall(value))
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket over requests and tokens per minute.
+    
+    Both buckets refill continuously; acquire() waits until there is room
+    for one request of the estimated size. Callers are served in arrival
+    order. A limit of 0 disables that bucket.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._rpm = float(requests_per_minute) if requests_per_minute > 0 else math.inf
+        self._tpm = float(tokens_per_minute) if tokens_per_minute > 0 else math.inf
+        self.requests_remaining = self._rpm
+        self.tokens_remaining = self._tpm
+        self.reset_at = 0.0  # Provider says the quota is exhausted until then (monotonic)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self.requests_remaining = min(self._rpm, self.requests_remaining + elapsed * self._rpm / 60)
+        self.tokens_remaining = min(self._tpm, self.tokens_remaining + elapsed * self._tpm / 60)
+    
+    @staticmethod
+    def _wait_for(needed: float, remaining: float, per_minute: float) -> float:
+        """Seconds until a bucket refills to `needed`"""
+        if remaining >= needed:
+            return 0.0
+        return (needed - remaining) * 60 / per_minute
+    
+    async def acquire(self, est_tokens: int):
+        """Wait until one request of about `est_tokens` tokens fits the quota"""
+        # A request larger than the whole bucket goes through once it is full
+        est_tokens = min(float(est_tokens), self._tpm)
+        
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.reset_at:
+                    await asyncio.sleep(self.reset_at - now)
+                    continue
+                
+                self._refill()
+                wait = max(
+                    self._wait_for(1, self.requests_remaining, self._rpm),
+                    self._wait_for(est_tokens, self.tokens_remaining, self._tpm)
+                )
+                if wait == 0:
+                    self.requests_remaining -= 1
+                    self.tokens_remaining -= est_tokens
+                    return
+                await asyncio.sleep(wait)
+    
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Correct the buckets from the provider's x-ratelimit-* response headers.
+        The provider's count wins when it is lower than ours; when either
+        quota is spent, new requests wait for its reset.
+        """
+        self._refill()
+        now = time.monotonic()
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            
+            if kind == "requests":
+                self.requests_remaining = min(self.requests_remaining, remaining)
+            else:
+                self.tokens_remaining = min(self.tokens_remaining, remaining)
+            
+            if remaining <= 0:
+                reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                self.reset_at = max(self.reset_at, now + reset)
+                logger.warning(f"LLM {kind} quota exhausted; pausing for {reset:.1f}s")
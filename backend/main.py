@@ -7,13 +7,22 @@ Entry point for the expense tracking REST API.
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import sys
 import time
-import logging
+import orjson
 
 from backend.config import settings, validate_config, print_config_summary
 from backend.api import auth, expenses, budgets, voice_routes, cost_routes, advisor
+from backend.api.cost_of_living import get_cost_service
+from backend.api.voice import get_voice_service
+from backend.llm.client import get_llm_client
+from backend.utils.http import etag_matches
 from backend.utils.logger import setup_logging
 
 # Setup logging
@@ -37,6 +46,16 @@ async def lifespan(app: FastAPI):
         logger.error(f"✗ Configuration error: {e}")
         raise
     
+    # Follow cost-of-living cache invalidations from other workers (Redis only)
+    await get_cost_service().start_invalidation_listener()
+    
+    # Load the transcription backend (and any local Whisper model) before traffic
+    try:
+        voice_service = await asyncio.to_thread(get_voice_service)
+        logger.info(f"✓ Voice service ready ({voice_service.mode} mode)")
+    except Exception as e:
+        logger.warning(f"Voice service unavailable: {e}")
+    
     # TODO: Initialize database connection pool
     # TODO: Verify Supabase connection
     # TODO: Check LLM availability
@@ -48,7 +67,13 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("👋 Shutting down application...")
     # TODO: Close database connections
-    # TODO: Cleanup resources
+    
+    # Close pooled HTTP clients (only if they were created)
+    if get_llm_client.cache_info().currsize:
+        await get_llm_client().aclose()
+    await get_cost_service().aclose()
+    # Queued log records are flushed by the atexit hook in setup_logging(),
+    # so the lifespan can run again in the same process without losing logs
 
 
 # ============================================
@@ -60,6 +85,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="LLM-powered expense tracking API with multimodal input",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -69,25 +95,73 @@ app = FastAPI(
 # Middleware
 # ============================================
 
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS Middleware (not needed when no cross-origin frontend is configured)
+if settings.CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=frozenset(settings.CORS_ORIGINS),  # O(1) origin checks; "*" is detected once at init
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+
+# Response compression. Bodies under 1 KB (root, health, single records) go
+# out as-is; level 5 gets most of level 9's ratio for far less CPU.
+# Server-sent events skip it, since gzip would buffer the token stream.
+_UNCOMPRESSED_PATHS = frozenset({f"{settings.API_PREFIX}/advisor/ask/stream"})
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves streaming endpoints alone"""
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"] in _UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=5)
+
+
+# Probes and crawler paths aren't worth timing
+_UNTIMED_PATHS = frozenset({"/health", "/favicon.ico", "/robots.txt", "/metrics"})
 
 
 # Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    """Add processing time to response headers"""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+class ProcessTimeMiddleware:
+    """
+    Add processing time to response headers.
+    Plain ASGI rather than @app.middleware("http"), which runs every request
+    through an extra task and memory stream.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in _UNTIMED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        
+        async def send_with_time(message: Message):
+            if message["type"] == "http.response.start":
+                # Whole microseconds rendered as "s.ffffff" bytes, skipping float
+                # formatting and a MutableHeaders wrapper
+                micros = int((time.perf_counter() - start) * 1_000_000)
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-process-time", b"%d.%06d" % divmod(micros, 1_000_000)),
+                ]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_time)
+
+
+app.add_middleware(ProcessTimeMiddleware)
 
 
 # ============================================
@@ -97,8 +171,8 @@ async def add_process_time_header(request: Request, call_next):
 @app.exception_handler(ValueError)
 async def value_error_handler(request: Request, exc: ValueError):
     """Handle validation errors"""
-    logger.error(f"Validation error: {exc}")
-    return JSONResponse(
+    logger.error("Validation error: %s", exc)
+    return ORJSONResponse(
         status_code=400,
         content={"error": "Validation Error", "detail": str(exc)}
     )
@@ -107,8 +181,8 @@ async def value_error_handler(request: Request, exc: ValueError):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle unexpected errors"""
-    logger.error(f"Unexpected error: {exc}", exc_info=True)
-    return JSONResponse(
+    logger.error("Unexpected error: %s", exc, exc_info=True)
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal Server Error", "detail": "An unexpected error occurred"}
     )
@@ -118,33 +192,45 @@ async def general_exception_handler(request: Request, exc: Exception):
 # Root Endpoint
 # ============================================
 
+# Both payloads depend only on settings, so they are serialized once
+_ROOT_BODY = orjson.dumps({
+    "name": settings.APP_NAME,
+    "version": settings.APP_VERSION,
+    "status": "running",
+    "docs": "/docs",
+    "endpoints": {
+        "auth": "/api/v1/auth",
+        "expenses": "/api/v1/expenses",
+        "budgets": "/api/v1/budgets",
+        "voice": "/api/v1/voice",
+        "cost-of-living": "/api/v1/cost-of-living",
+    }
+})
+
+# Strong validator for the root payload, so repeat callers get a bodyless 304
+_ROOT_ETAG = '"' + hashlib.blake2b(_ROOT_BODY, digest_size=8).hexdigest() + '"'
+_ROOT_HEADERS = {"ETag": _ROOT_ETAG, "Cache-Control": "public, max-age=300"}
+
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "environment": settings.ENVIRONMENT,
+    "llm_provider": settings.LLM_PROVIDER,
+    "version": settings.APP_VERSION
+})
+
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """API root endpoint"""
-    return {
-        "name": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running",
-        "docs": "/docs",
-        "endpoints": {
-            "auth": "/api/v1/auth",
-            "expenses": "/api/v1/expenses",
-            "budgets": "/api/v1/budgets",
-            "voice": "/api/v1/voice",
-            "cost-of-living": "/api/v1/cost-of-living",
-        }
-    }
+    if etag_matches(request.headers.get("if-none-match"), _ROOT_ETAG):
+        return Response(status_code=304, headers=_ROOT_HEADERS)
+    return Response(content=_ROOT_BODY, media_type="application/json", headers=_ROOT_HEADERS)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "environment": settings.ENVIRONMENT,
-        "llm_provider": settings.LLM_PROVIDER,
-        "version": settings.APP_VERSION
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 # ============================================
@@ -200,5 +286,9 @@ if __name__ == "__main__":
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
+        workers=1 if settings.DEBUG else settings.WEB_CONCURRENCY,  # reload needs a single process
+        log_level=settings.LOG_LEVEL.lower(),
+        # Same loop and parser as the Procfile/Dockerfile; uvloop has no Windows build
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools"
     )
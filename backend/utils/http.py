@@ -0,0 +1,25 @@
+# CHECKPOINT_9_API_INTEGRATION
+"""
+HTTP Utilities
+==============
+Conditional request helpers shared by the API routes.
+"""
+
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against a response's ETag.
+    
+    Uses the weak comparison GET requires: each listed tag is compared
+    exactly with any W/ prefix stripped, and "*" matches anything.
+    """
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
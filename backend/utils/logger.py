@@ -5,11 +5,19 @@ Logging Utilities
 Centralized logging configuration.
 """
 
+import atexit
 import logging
 import sys
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from queue import SimpleQueue
+from typing import Optional
 from backend.config import settings
 
+# Writes log records to the real handlers on a background thread
+_listener: Optional[QueueListener] = None
+
 
 def setup_logging() -> logging.Logger:
     """
@@ -24,20 +32,37 @@ def setup_logging() -> logging.Logger:
     # Configure logging format
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
-    # Configure root logger
-    logging.basicConfig(
-        level=getattr(logging, settings.LOG_LEVEL),
-        format=log_format,
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-        ]
-    )
+    # The format uses no thread/process fields, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    # Don't print handler errors to stderr in production
+    if settings.ENVIRONMENT == "production":
+        logging.raiseExceptions = False
     
-    # Add file handler if enabled
+    # Stdout, plus a file handler if enabled
+    handlers = [logging.StreamHandler(sys.stdout)]
     if settings.LOG_TO_FILE:
-        file_handler = logging.FileHandler(settings.LOG_FILE_PATH)
-        file_handler.setFormatter(logging.Formatter(log_format))
-        logging.getLogger().addHandler(file_handler)
+        handlers.append(logging.FileHandler(settings.LOG_FILE_PATH))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(log_format))
+    
+    # Configure root logger. Callers only enqueue records; the stream and
+    # file writes happen on the listener's thread, off the event loop.
+    global _listener
+    if _listener is None:
+        queue = SimpleQueue()
+        queue_handler = QueueHandler(queue)
+        # QueueHandler pre-formats the message; the real handlers add the prefix
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.basicConfig(
+            level=getattr(logging, settings.LOG_LEVEL),
+            handlers=[queue_handler]
+        )
+        _listener = QueueListener(queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
     
     logger = logging.getLogger("expense_tracker")
     logger.info("Logging configured successfully")
@@ -45,6 +70,15 @@ def setup_logging() -> logging.Logger:
     return logger
 
 
+def stop_logging():
+    """Flush queued log records and stop the background writer (runs at exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@lru_cache(maxsize=None)
 def get_logger(name: str) -> logging.Logger:
-    """Get a logger for a specific module"""
+    """Get a logger for a specific module (cached; getLogger takes the logging lock)"""
     return logging.getLogger(f"expense_tracker.{name}")
@@ -64,6 +64,8 @@ CREATE INDEX idx_expenses_user_id ON expenses(user_id);
 CREATE INDEX idx_expenses_date ON expenses(expense_date);
 CREATE INDEX idx_expenses_category ON expenses(category);
 CREATE INDEX idx_expenses_created_at ON expenses(created_at);
+CREATE INDEX idx_expenses_user_category ON expenses(user_id, category, expense_date);
+CREATE INDEX idx_expenses_user_date_id ON expenses(user_id, expense_date DESC, id DESC);
 
 -- ============================================
 -- TABLE: budgets
@@ -194,6 +196,32 @@ CREATE INDEX idx_llm_logs_user_id ON llm_logs(user_id);
 CREATE INDEX idx_llm_logs_created_at ON llm_logs(created_at);
 CREATE INDEX idx_llm_logs_success ON llm_logs(success);
 
+-- ============================================
+-- TABLE: receipt_jobs
+-- ============================================
+-- Purpose: Track background receipt parsing jobs (OCR + LLM)
+-- CHECKPOINT_7_API_ENDPOINTS
+
+CREATE TABLE IF NOT EXISTS receipt_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    
+    -- Job state
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    result JSONB, -- ReceiptParseResponse once completed
+    error TEXT,
+    
+    -- Timestamps
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    -- Constraints
+    CONSTRAINT valid_receipt_job_status CHECK (status IN ('pending', 'processing', 'completed', 'failed'))
+);
+
+CREATE INDEX idx_receipt_jobs_user_id ON receipt_jobs(user_id);
+CREATE INDEX idx_receipt_jobs_created_at ON receipt_jobs(created_at);
+
 -- ============================================
 -- FUNCTIONS & TRIGGERS
 -- ============================================
@@ -223,6 +251,12 @@ CREATE TRIGGER update_budgets_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Apply trigger to receipt_jobs table
+CREATE TRIGGER update_receipt_jobs_updated_at
+    BEFORE UPDATE ON receipt_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 -- ============================================
 -- VIEWS
 -- ============================================
@@ -261,6 +295,266 @@ LEFT JOIN expenses e ON b.user_id = e.user_id
     AND (b.end_date IS NULL OR e.expense_date <= b.end_date)
 GROUP BY b.id, b.user_id, b.category, b.amount, b.period;
 
+-- ============================================
+-- RPC FUNCTIONS
+-- ============================================
+-- Aggregations called from the API via supabase.rpc() so that only
+-- one row per category crosses the wire instead of every expense.
+
+-- Function: Total spending per category for a user
+-- (optionally restricted to a single category and/or a start date)
+CREATE OR REPLACE FUNCTION sum_expenses_by_category(
+    uid UUID,
+    cat VARCHAR DEFAULT NULL,
+    since DATE DEFAULT NULL
+)
+RETURNS TABLE (category VARCHAR, total DECIMAL)
+STABLE
+SET search_path = public
+LANGUAGE sql
+AS $$
+    SELECT e.category, SUM(e.amount) AS total
+    FROM expenses e
+    WHERE e.user_id = uid
+      AND (cat IS NULL OR e.category = cat)
+      AND (since IS NULL OR e.expense_date >= since)
+    GROUP BY e.category;
+$$;
+
+-- Function: Total spending per category for several users at once
+CREATE OR REPLACE FUNCTION sum_expenses_by_user_category(uids UUID[])
+RETURNS TABLE (user_id UUID, category VARCHAR, total DECIMAL)
+STABLE
+SET search_path = public
+LANGUAGE sql
+AS $$
+    SELECT e.user_id, e.category, SUM(e.amount) AS total
+    FROM expenses e
+    WHERE e.user_id = ANY(uids)
+    GROUP BY e.user_id, e.category;
+$$;
+
+-- Function: Per-category totals, counts and date span for a user's expenses
+-- (optionally restricted to an inclusive date range)
+CREATE OR REPLACE FUNCTION summarize_expenses_by_category(
+    uid UUID,
+    start_date DATE DEFAULT NULL,
+    end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    category VARCHAR,
+    total DECIMAL,
+    expense_count BIGINT,
+    first_date DATE,
+    last_date DATE
+)
+STABLE
+SET search_path = public
+LANGUAGE sql
+AS $$
+    SELECT
+        e.category,
+        SUM(e.amount) AS total,
+        COUNT(*) AS expense_count,
+        MIN(e.expense_date) AS first_date,
+        MAX(e.expense_date) AS last_date
+    FROM expenses e
+    WHERE e.user_id = uid
+      AND (summarize_expenses_by_category.start_date IS NULL
+           OR e.expense_date >= summarize_expenses_by_category.start_date)
+      AND (summarize_expenses_by_category.end_date IS NULL
+           OR e.expense_date <= summarize_expenses_by_category.end_date)
+    GROUP BY e.category;
+$$;
+
+-- Function: A user's budgets with their category spending
+-- spent:          spending in the budget's category inside its own period
+--                 window (`since` maps each period to its window start, e.g.
+--                 {"monthly": "2026-01-01"}; unmapped periods use default_since)
+-- category_spent: spending in the category since default_since, the one
+--                 window used for the list's overall total
+-- Categories with spending but no budget come back with NULL budget columns.
+DROP FUNCTION IF EXISTS list_budgets_with_spent(UUID);
+DROP FUNCTION IF EXISTS list_budgets_with_spent(UUID, JSONB, DATE);
+CREATE OR REPLACE FUNCTION list_budgets_with_spent(
+    uid UUID,
+    since JSONB,
+    default_since DATE
+)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    category VARCHAR,
+    amount DECIMAL,
+    period VARCHAR,
+    start_date DATE,
+    created_at TIMESTAMP WITH TIME ZONE,
+    spent DECIMAL,
+    category_spent DECIMAL
+)
+STABLE
+SET search_path = public
+LANGUAGE sql
+AS $$
+    SELECT
+        b.id,
+        b.user_id,
+        b.category,
+        b.amount,
+        b.period,
+        b.start_date,
+        b.created_at,
+        COALESCE((
+            SELECT SUM(e.amount)
+            FROM expenses e
+            WHERE e.user_id = uid
+              AND e.category = b.category
+              AND e.expense_date >= COALESCE((since ->> b.period)::DATE, default_since)
+        ), 0),
+        COALESCE((
+            SELECT SUM(e.amount)
+            FROM expenses e
+            WHERE e.user_id = uid
+              AND e.category = b.category
+              AND e.expense_date >= default_since
+        ), 0)
+    FROM budgets b
+    WHERE b.user_id = uid
+    UNION ALL
+    SELECT NULL, NULL, e.category, NULL, NULL, NULL, NULL, SUM(e.amount), SUM(e.amount)
+    FROM expenses e
+    WHERE e.user_id = uid
+      AND e.expense_date >= default_since
+      AND NOT EXISTS (
+          SELECT 1 FROM budgets b WHERE b.user_id = uid AND b.category = e.category
+      )
+    GROUP BY e.category;
+$$;
+
+-- Function: Insert an expense and its calendar entry in one statement
+-- (the calendar row is fed from the expense's RETURNING clause, so both
+-- land in the same transaction with a single round trip)
+CREATE OR REPLACE FUNCTION add_expense_with_calendar(
+    uid UUID,
+    amt DECIMAL,
+    cat VARCHAR,
+    descr TEXT,
+    exp_date DATE,
+    entry_title VARCHAR,
+    method VARCHAR DEFAULT 'text',
+    raw TEXT DEFAULT NULL,
+    extracted JSONB DEFAULT NULL,
+    validated JSONB DEFAULT NULL
+)
+RETURNS SETOF expenses
+SET search_path = public
+LANGUAGE sql
+AS $$
+    WITH new_expense AS (
+        INSERT INTO expenses (
+            user_id, amount, category, description, expense_date,
+            input_method, raw_input, llm_extracted, llm_validated
+        )
+        VALUES (uid, amt, cat, descr, exp_date, method, raw, extracted, validated)
+        RETURNING *
+    ), new_entry AS (
+        INSERT INTO calendar_entries (
+            user_id, expense_id, entry_date, title, description, amount, category
+        )
+        SELECT user_id, id, expense_date, entry_title, description, amount, category
+        FROM new_expense
+    )
+    SELECT * FROM new_expense;
+$$;
+
+-- Function: Insert several expenses and their calendar entries in one
+-- statement (items is a JSON array of expense rows)
+CREATE OR REPLACE FUNCTION add_expenses_with_calendar_bulk(items JSONB)
+RETURNS SETOF expenses
+SET search_path = public
+LANGUAGE sql
+AS $$
+    WITH new_expenses AS (
+        INSERT INTO expenses (
+            user_id, amount, category, description, expense_date,
+            input_method, raw_input, llm_extracted, llm_validated
+        )
+        SELECT user_id, amount, category, description, expense_date,
+               COALESCE(input_method, 'text'), raw_input, llm_extracted, llm_validated
+        FROM jsonb_to_recordset(items) AS item(
+            user_id UUID,
+            amount DECIMAL,
+            category VARCHAR,
+            description TEXT,
+            expense_date DATE,
+            input_method VARCHAR,
+            raw_input TEXT,
+            llm_extracted JSONB,
+            llm_validated JSONB
+        )
+        RETURNING *
+    ), new_entries AS (
+        INSERT INTO calendar_entries (
+            user_id, expense_id, entry_date, title, description, amount, category
+        )
+        SELECT user_id, id, expense_date, category || ': $' || amount, description, amount, category
+        FROM new_expenses
+    )
+    SELECT * FROM new_expenses;
+$$;
+
+-- Function: Set a budget in one round trip (updates the most recent
+-- budget for the category/period, otherwise inserts a new one). Calls for
+-- the same user/category/period are serialized with a transaction-scoped
+-- advisory lock, so two concurrent calls can't both insert.
+CREATE OR REPLACE FUNCTION upsert_budget(
+    uid UUID,
+    cat VARCHAR,
+    amt DECIMAL,
+    per VARCHAR DEFAULT 'monthly'
+)
+RETURNS SETOF budgets
+SET search_path = public
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtextextended(uid::TEXT || ':' || cat || ':' || per, 0));
+    
+    RETURN QUERY
+    UPDATE budgets SET amount = amt
+    WHERE id = (
+        SELECT b.id FROM budgets b
+        WHERE b.user_id = uid AND b.category = cat AND b.period = per
+        ORDER BY b.start_date DESC, b.created_at DESC
+        LIMIT 1
+    )
+    RETURNING *;
+    
+    IF NOT FOUND THEN
+        RETURN QUERY
+        INSERT INTO budgets (user_id, category, amount, period)
+        VALUES (uid, cat, amt, per)
+        ON CONFLICT ON CONSTRAINT unique_user_category_budget
+        DO UPDATE SET amount = EXCLUDED.amount
+        RETURNING *;
+    END IF;
+END;
+$$;
+
+-- Function: Delete receipt jobs older than max_age (results are only
+-- polled for shortly after upload); returns the number of jobs removed
+CREATE OR REPLACE FUNCTION purge_expired_receipt_jobs(max_age INTERVAL DEFAULT '1 day')
+RETURNS INTEGER
+SET search_path = public
+LANGUAGE sql
+AS $$
+    WITH deleted AS (
+        DELETE FROM receipt_jobs WHERE created_at < NOW() - max_age
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM deleted;
+$$;
+
 -- ============================================
 -- SEED DATA (Optional - for testing)
 -- ============================================
@@ -280,6 +574,7 @@ ALTER TABLE expenses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE budgets ENABLE ROW LEVEL SECURITY;
 ALTER TABLE calendar_entries ENABLE ROW LEVEL SECURITY;
 ALTER TABLE cost_of_living_index ENABLE ROW LEVEL SECURITY;
+ALTER TABLE receipt_jobs ENABLE ROW LEVEL SECURITY;
 
 -- Policy: Users can only see their own data
 CREATE POLICY users_select_own ON users
@@ -298,6 +593,9 @@ CREATE POLICY budgets_all_own ON budgets
 CREATE POLICY calendar_all_own ON calendar_entries
     FOR ALL USING (user_id = current_setting('app.user_id')::uuid);
 
+CREATE POLICY receipt_jobs_all_own ON receipt_jobs
+    FOR ALL USING (user_id = current_setting('app.user_id')::uuid);
+
 -- Policy: Cost of living data is public (read-only)
 CREATE POLICY cost_of_living_select_all ON cost_of_living_index
     FOR SELECT USING (true);
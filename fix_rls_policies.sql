@@ -15,6 +15,7 @@
 ALTER TABLE expenses DISABLE ROW LEVEL SECURITY;
 ALTER TABLE budgets DISABLE ROW LEVEL SECURITY;
 ALTER TABLE calendar_entries DISABLE ROW LEVEL SECURITY;
+ALTER TABLE receipt_jobs DISABLE ROW LEVEL SECURITY;
 
 -- Keep users table RLS disabled if auth is working
 ALTER TABLE users DISABLE ROW LEVEL SECURITY;
@@ -32,7 +33,7 @@ SELECT
     rowsecurity 
 FROM pg_tables 
 WHERE schemaname = 'public' 
-AND tablename IN ('users', 'expenses', 'budgets', 'calendar_entries')
+AND tablename IN ('users', 'expenses', 'budgets', 'calendar_entries', 'receipt_jobs')
 ORDER BY tablename;
 
 -- Expected: All should show rowsecurity = false
@@ -0,0 +1,52 @@
+"""Regression tests for the rule-based expense fast path"""
+
+import pytest
+
+from backend.llm.fast_categorize import fast_parse
+
+
+@pytest.mark.parametrize("text, amount, category", [
+    ("uber 15", 15.0, "transportation"),
+    ("15 uber", 15.0, "transportation"),
+    ("$4.50 coffee", 4.5, "food"),
+    ("coffee 4.50", 4.5, "food"),
+    ("spent 20 dollars on groceries", 20.0, "food"),
+    ("netflix $15.99", 15.99, "entertainment"),
+])
+def test_obvious_expenses_are_parsed(text, amount, category):
+    result = fast_parse(text)
+    assert result is not None
+    data = result["validated"]["validated_data"]
+    assert data["amount"] == amount
+    assert data["category"] == category
+
+
+@pytest.mark.parametrize("text", [
+    # The number is a count, not an amount
+    "lunch with 3 friends",
+    # Income, refunds and sales
+    "I got paid 50 by uber",
+    "earned 200 from uber driving",
+    "sold my bus pass 20",
+    "uber refunded me 15",
+    "lent 30 for dinner",
+    # Negated purchases
+    "didnt buy coffee 5",
+    "didn't buy coffee 5",
+    "did not take the bus 3",
+    # Ambiguous or out of scope
+    "coffee and uber 12",
+    "uber 15 yesterday",
+    "coffee",
+    "",
+])
+def test_ambiguous_inputs_go_to_the_llm(text):
+    assert fast_parse(text) is None
+
+
+def main():
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+
+if __name__ == "__main__":
+    main()